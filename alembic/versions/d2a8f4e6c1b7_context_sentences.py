@@ -0,0 +1,39 @@
+"""context sentences
+
+Revision ID: d2a8f4e6c1b7
+Revises: b5e1c7a2d9f3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ENUM
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f4e6c1b7'
+down_revision: Union[str, None] = 'b5e1c7a2d9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'context_sentences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('translation_id', sa.Integer(), nullable=False),
+        sa.Column('level', ENUM('A', 'B', 'C', name='cefr', create_type=False), nullable=False),
+        sa.Column('en', sa.Text(), nullable=False),
+        sa.Column('ru', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['translation_id'], ['translations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('translation_id', 'level'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('context_sentences')
@@ -6,6 +6,8 @@ import subprocess
 import io
 import soundfile as sf
 
+from audio.decode import decode_bytes, SR
+
 def load_and_trim(file_path, sr=16000, top_db=20):
     """
     Универсальная загрузка .ogg/.wav c авто-конвертацией:
@@ -43,53 +45,79 @@ def compute_dtw(features_ref, features_test):
     norm_cost = dtw_cost / len(wp)
     return norm_cost, wp
 
+MIN_SPEECH_MS = 90          # меньше трёх 30-мс фреймов речи – оценивать нечего
+
+
+class NoSpeech(ValueError):
+    """В записи нет речи (или её слишком мало для оценки)."""
+
+
 def convert_to_pcm16(y):
     """
-    Преобразует float-аудио ([-1, 1]) в байты PCM16 (little-endian).
+    Преобразует float-аудио ([-1, 1]) в массив PCM16 (int16, little-endian).
     """
     # Масштабируем до диапазона int16 и конвертируем
-    y_int16 = np.int16(y * 32767)
-    return y_int16.tobytes()
+    return np.int16(y * 32767)
 
-def frame_generator(frame_duration_ms, audio_bytes, sample_rate):
+def frame_view(pcm, frame_duration_ms, sample_rate):
     """
-    Разбивает аудио (в виде байтов PCM16) на фреймы длительностью frame_duration_ms.
+    Разбивает PCM16 на фреймы длительностью frame_duration_ms.
+    Возвращает view формы (n_frames, frame_size) без копирования; хвост отбрасывается.
     """
     frame_size = int(sample_rate * frame_duration_ms / 1000)  # число сэмплов в фрейме
-    n_bytes = frame_size * 2  # 2 байта на сэмпл для PCM16
-    offset = 0
-    frames = []
-    while offset + n_bytes <= len(audio_bytes):
-        frames.append(audio_bytes[offset:offset+n_bytes])
-        offset += n_bytes
-    return frames
+    n_frames = len(pcm) // frame_size
+    return pcm[:n_frames * frame_size].reshape(n_frames, frame_size)
 
 def analyze_vad(y, sr, frame_duration_ms=30, vad_mode=3):
     """
     Анализирует аудио на наличие речи по фреймам с использованием webrtcvad.
-    Возвращает список булевых значений: True, если в фрейме обнаружена речь.
+    Возвращает (маска речи bool[n_frames], фреймы int16[n_frames, frame_size]).
     """
     vad = webrtcvad.Vad(vad_mode)  # режим 3 - максимально агрессивный
-    audio_bytes = convert_to_pcm16(y)
-    frames = frame_generator(frame_duration_ms, audio_bytes, sr)
-    speech_flags = [vad.is_speech(frame, sr) for frame in frames]
-    return speech_flags, frames
+    frames = frame_view(convert_to_pcm16(y), frame_duration_ms, sr)
+    return vad_flags(vad, frames, sr), frames
+
+
+def vad_flags(vad, frames, sr):
+    """
+    Маска речи для готовых фреймов int16[n_frames, frame_size].
+    """
+    # байтовый view строки – webrtcvad читает буфер без копии
+    raw = frames.view(np.uint8)
+    return np.fromiter(
+        (vad.is_speech(row.data, sr, frames.shape[1]) for row in raw),
+        dtype=bool, count=len(frames),
+    )
 
 
 def analyse(file_path):
     y, sr = load_and_trim(file_path)
+    return analyse_signal(y, sr)
+
+
+def analyse_bytes(data, top_db=20):
+    """
+    То же, что analyse, но для записи в памяти (байты загрузки) – без temp-файла.
+    """
+    y = decode_bytes(data)
+    y_trim, _ = librosa.effects.trim(y, top_db=top_db)
+    return analyse_signal(y_trim, SR)
+
+
+def analyse_signal(y, sr):
+    # Быстрый выход: после обрезки тишины почти ничего не осталось
+    if len(y) * 1000 < MIN_SPEECH_MS * sr:
+        raise NoSpeech("Recording is empty or too short")
 
     # Анализируем аудио: получаем для каждого фрейма, есть ли речь
     speech_flags, frames = analyze_vad(y, sr, frame_duration_ms=30, vad_mode=3)
 
-    # Выводим количество речевых и неречевых фреймов
-    num_frames = len(speech_flags)
-    num_speech = sum(speech_flags)
-    # print(f"Всего фреймов: {num_frames}, речевых: {num_speech}, неречевых: {num_frames - num_speech}")
+    # Количество речевых фреймов
+    num_speech = int(np.count_nonzero(speech_flags))
+    if num_speech * 30 < MIN_SPEECH_MS:
+        raise NoSpeech("No speech detected")
 
-    # Если необходимо, можно собрать аудио только с речевыми фреймами:
-    speech_audio_bytes = b"".join([frame for flag, frame in zip(speech_flags, frames) if flag])
-    # Для дальнейшей обработки можно преобразовать обратно в numpy массив:
-    speech_audio = np.frombuffer(speech_audio_bytes, dtype=np.int16).astype(np.float32) / 32767.
+    # Собираем аудио только с речевыми фреймами (одна выборка по маске)
+    speech_audio = frames[speech_flags].reshape(-1).astype(np.float32) / 32767.
 
     return extract_mfcc(speech_audio, sr)
\ No newline at end of file
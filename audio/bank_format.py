@@ -0,0 +1,419 @@
+"""Шардированный, memory-mapped формат банка эталонных признаков.
+
+Структура каталога::
+
+    features/
+        CURRENT                # имя текущего поколения (версия банка)
+        generations/<v>.json   # manifest поколения: слова, смещения, хэши
+        shards/<hash>.npy      # все эталоны слова подряд, float32 (ΣT, 39)
+                               # (или .f16.npy / .i8.npy + .i8q.npy, см. audio/quantize.py)
+        shards/<hash>.s16.npy  # конспекты эталонов для предотбора (n, 16, 39)
+        shards/<hash>.dba3.npy # усреднённые шаблоны слова подряд (ΣT, 39), если собраны
+
+* шард хранит кадры построчно, так что эталон – непрерывный блок строк и
+  читается через ``np.load(mmap_mode="r")`` без распаковки и копий;
+* имя шарда – хэш его содержимого: при пересборке переписываются только
+  изменившиеся слова, а старые mmap'ы читателей остаются валидными;
+* manifest'ы поколений неизменяемы, пересборка публикует новое поколение
+  и атомарно (``os.replace``) переключает ``CURRENT``: читатели – API,
+  воркеры пула, другие процессы uvicorn – mmap'ят одни и те же файлы
+  (страницы в page cache общие) и переходят на новую версию без рестарта;
+* старые поколения и их шарды удаляются не сразу, а спустя ``GC_GRACE``
+  секунд после замены, так что читатель, ещё не заметивший переключения,
+  никогда не останется без файлов.
+
+Банки до поколений (один ``manifest.json``) читаются как раньше и
+переводятся на поколения при следующей записи.
+
+Миграция со старого архива::
+
+    python -m audio.bank_format export audio/features.npz audio/features
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Mapping, Optional, Union
+
+import numpy as np
+
+from audio.prefilter import SUMMARY_LEN, summarize_all
+from audio.quantize import DTYPES, SUFFIX, dequantize, quantize
+
+BASE_DIR = Path(__file__).resolve().parent
+BANK_DIR = BASE_DIR / "features"
+MANIFEST = "manifest.json"      # банки до поколений
+CURRENT = "CURRENT"
+GENERATIONS = "generations"
+SHARDS = "shards"
+FORMAT_VERSION = 1
+
+KEEP_GENERATIONS = 2            # поколений, которые хранятся всегда
+GC_GRACE = 600.0                # сек: сколько живут заменённые поколения и ничейные шарды
+
+
+def parse_key(key: str) -> tuple[str, int]:
+    """``"<word>_<idx>.ogg"`` → ``(word, idx)``."""
+    stem = key.rsplit(".", 1)[0]
+    word, _, idx = stem.rpartition("_")
+    if not word:
+        return stem, 0
+    return word, int(idx) if idx.isdigit() else 0
+
+
+def group_by_word(features: Mapping[str, np.ndarray]) -> dict[str, list[tuple[str, np.ndarray]]]:
+    """``{"cat_1.ogg": f1, "cat_0.ogg": f0}`` → ``{"cat": [("cat_0.ogg", f0), ("cat_1.ogg", f1)]}``."""
+    grouped: dict[str, list[tuple[int, str, np.ndarray]]] = {}
+    for key, feat in features.items():
+        word, idx = parse_key(key)
+        grouped.setdefault(word, []).append((idx, key, feat))
+    return {
+        word: [(key, feat) for _, key, feat in sorted(items, key=lambda p: p[0])]
+        for word, items in grouped.items()
+    }
+
+
+def _hash(*chunks: bytes) -> str:
+    h = hashlib.sha256()
+    for c in chunks:
+        h.update(c)
+    return h.hexdigest()
+
+
+def _atomic_write(path: Path, write) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# ── reading ──────────────────────────────────────────────────────────────────
+def current_generation(bank_dir: Union[str, Path]) -> Optional[str]:
+    """Имя текущего поколения; ``None`` для банков без ``CURRENT``."""
+    try:
+        return (Path(bank_dir) / CURRENT).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def manifest_path(bank_dir: Union[str, Path]) -> Path:
+    """manifest текущего поколения (или ``manifest.json`` старого банка)."""
+    bank_dir = Path(bank_dir)
+    generation = current_generation(bank_dir)
+    if generation is None:
+        return bank_dir / MANIFEST
+    return bank_dir / GENERATIONS / f"{generation}.json"
+
+
+def watch_path(bank_dir: Union[str, Path]) -> Path:
+    """Файл, который меняется при каждой публикации банка."""
+    current = Path(bank_dir) / CURRENT
+    return current if current.exists() else Path(bank_dir) / MANIFEST
+
+
+def bank_exists(bank_dir: Union[str, Path]) -> bool:
+    return manifest_path(bank_dir).exists()
+
+
+def read_manifest(bank_dir: Union[str, Path]) -> Optional[dict]:
+    try:
+        with open(manifest_path(bank_dir), "rb") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def referenced_files(manifest: dict) -> set[str]:
+    """Все файлы шардов (относительно каталога банка), на которые ссылается manifest."""
+    words = manifest.get("words", {}).values()
+    live = {e[k] for e in words for k in ("shard", "summary", "quant") if k in e}
+    live |= {e["templates"]["shard"] for e in words if "templates" in e}
+    return live
+
+
+def open_shard(bank_dir: Union[str, Path], entry: dict) -> np.ndarray:
+    """Read-only mmap шарда слова, форма (ΣT, dim)."""
+    return np.load(Path(bank_dir) / entry["shard"], mmap_mode="r")
+
+
+def open_quant(bank_dir: Union[str, Path], entry: dict) -> Optional[np.ndarray]:
+    """``[scale, offset]`` int8-шарда слова; ``None`` для float-шардов."""
+    if "quant" not in entry:
+        return None
+    return np.load(Path(bank_dir) / entry["quant"])
+
+
+def shard_refs(shard: np.ndarray, entry: dict, quant: Optional[np.ndarray] = None) -> list[np.ndarray]:
+    """Эталоны слова формы (dim, T): view поверх float32-шарда (без копий),
+    для float16/int8 – распакованные во float32 по одному эталону."""
+    blocks = [shard[r["offset"]:r["offset"] + r["frames"]] for r in entry["refs"]]
+    if shard.dtype == np.float32:
+        return [b.T for b in blocks]
+    return [dequantize(b, quant).T for b in blocks]
+
+
+def open_summary(bank_dir: Union[str, Path], entry: dict) -> Optional[np.ndarray]:
+    """Read-only mmap конспектов слова (n, L, dim); ``None`` для старых банков."""
+    if "summary" not in entry:
+        return None
+    return np.load(Path(bank_dir) / entry["summary"], mmap_mode="r")
+
+
+def open_templates(bank_dir: Union[str, Path], entry: dict) -> Optional[np.ndarray]:
+    """Read-only mmap шаблонов слова (ΣT, dim); ``None``, если их не собирали."""
+    if "templates" not in entry:
+        return None
+    return np.load(Path(bank_dir) / entry["templates"]["shard"], mmap_mode="r")
+
+
+def template_refs(shard: np.ndarray, entry: dict) -> list[tuple[np.ndarray, dict]]:
+    """Шаблоны слова: ``[(view (dim, T), {"members", "spread"}), …]``."""
+    return [
+        (shard[t["offset"]:t["offset"] + t["frames"]].T,
+         {"members": t["members"], "spread": t["spread"]})
+        for t in entry["templates"]["items"]
+    ]
+
+
+# ── writing ──────────────────────────────────────────────────────────────────
+TemplateBuilder = Callable[[list[np.ndarray]], list[tuple[np.ndarray, dict]]]
+
+
+def write_bank(bank_dir: Union[str, Path], features: Mapping[str, np.ndarray],
+               templates: Optional[TemplateBuilder] = None, templates_key: str = "dba",
+               dtype: str = "float32") -> dict:
+    """Записывает банк из ``{"<word>_<idx>.ogg": (dim, T)}``.
+
+    Неизменившиеся слова (тот же хэш) переиспользуют существующие шарды.
+    ``templates`` – построитель усреднённых шаблонов слова (см.
+    audio/templates.py); вызывается только для слов, у которых шаблонов с
+    ключом ``templates_key`` ещё нет. ``dtype`` – тип хранения эталонов
+    (``float32``, ``float16`` или ``int8``). Возвращает статистику
+    ``{"words", "refs", "written", "reused", "templates"}``.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown bank dtype `{dtype}`")
+    bank_dir = Path(bank_dir)
+    shards_dir = bank_dir / SHARDS
+    shards_dir.mkdir(parents=True, exist_ok=True)
+
+    old = read_manifest(bank_dir) or {}
+    old_words = old.get("words", {})
+
+    words: dict[str, dict] = {}
+    written = reused = n_refs = n_templates = 0
+    dim = None
+    for word, items in sorted(group_by_word(features).items()):
+        frames = [np.ascontiguousarray(np.asarray(f, dtype=np.float32).T) for _, f in items]
+        dim = dim or frames[0].shape[1]
+        refs, offset = [], 0
+        for (key, _), fr in zip(items, frames):
+            refs.append({
+                "key": key,
+                "offset": offset,
+                "frames": int(fr.shape[0]),
+                "hash": _hash(str(fr.shape).encode(), fr.tobytes())[:16],
+            })
+            offset += fr.shape[0]
+        word_hash = _hash(*(r["hash"].encode() for r in refs))[:16]
+        shard_name = f"{SHARDS}/{word_hash}{SUFFIX[dtype]}.npy"
+        quant_name = f"{SHARDS}/{word_hash}.i8q.npy" if dtype == "int8" else None
+        summary_name = f"{SHARDS}/{word_hash}.s{SUMMARY_LEN}.npy"
+
+        prev = old_words.get(word)
+        stored = [bank_dir / shard_name] + ([bank_dir / quant_name] if quant_name else [])
+        if all(p.exists() for p in stored):
+            reused += 1
+        else:
+            block = np.concatenate(frames, axis=0) if frames else np.zeros((0, dim), np.float32)
+            data, quant = quantize(block, dtype)
+            if quant is not None:
+                _atomic_write(bank_dir / quant_name, lambda fh: np.save(fh, quant))
+            _atomic_write(bank_dir / shard_name, lambda fh: np.save(fh, data))
+            written += 1
+        if not (bank_dir / summary_name).exists():
+            summaries = summarize_all([f for _, f in items])
+            _atomic_write(bank_dir / summary_name, lambda fh: np.save(fh, summaries))
+
+        words[word] = {"shard": shard_name, "summary": summary_name, "hash": word_hash, "refs": refs}
+        if quant_name:
+            words[word]["quant"] = quant_name
+        n_refs += len(refs)
+
+        if templates is not None:
+            tpl_name = f"{SHARDS}/{word_hash}.{templates_key}.npy"
+            old_tpl = (prev or {}).get("templates")
+            if old_tpl and old_tpl["shard"] == tpl_name and (bank_dir / tpl_name).exists():
+                words[word]["templates"] = old_tpl
+                continue
+            built = templates([f for _, f in items])
+            tpl_frames = [np.ascontiguousarray(np.asarray(t, dtype=np.float32).T) for t, _ in built]
+            entries, offset = [], 0
+            for fr, (_, meta) in zip(tpl_frames, built):
+                entries.append({"offset": offset, "frames": int(fr.shape[0]), **meta})
+                offset += fr.shape[0]
+            block = np.concatenate(tpl_frames, axis=0) if tpl_frames else np.zeros((0, dim), np.float32)
+            _atomic_write(bank_dir / tpl_name, lambda fh: np.save(fh, block))
+            words[word]["templates"] = {"shard": tpl_name, "items": entries}
+            n_templates += len(entries)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": _hash(dtype.encode(),
+                         *(f"{w}:{e['hash']}:{e.get('templates', {}).get('shard', '')}".encode()
+                           for w, e in words.items()))[:16],
+        "dim": dim or 0,
+        "dtype": dtype,
+        "words": words,
+    }
+    publish(bank_dir, manifest)
+    collect_garbage(bank_dir)
+
+    return {"words": len(words), "refs": n_refs, "written": written, "reused": reused,
+            "templates": n_templates}
+
+
+def publish(bank_dir: Union[str, Path], manifest: dict) -> None:
+    """Записывает поколение ``manifest["version"]`` и атомарно делает его текущим.
+
+    Шарды manifest'а уже должны лежать в ``shards/``.
+    """
+    bank_dir = Path(bank_dir)
+    gen_dir = bank_dir / GENERATIONS
+    gen_dir.mkdir(parents=True, exist_ok=True)
+    version = manifest["version"]
+
+    # старый manifest.json становится обычным поколением и уходит через GC
+    legacy = bank_dir / MANIFEST
+    previous = current_generation(bank_dir)
+    if previous is None and legacy.exists():
+        previous = (read_manifest(bank_dir) or {}).get("version")
+        if previous:
+            os.replace(legacy, gen_dir / f"{previous}.json")
+
+    _atomic_write(gen_dir / f"{version}.json",
+                  lambda fh: fh.write(json.dumps(manifest, ensure_ascii=False).encode()))
+    _atomic_write(bank_dir / CURRENT, lambda fh: fh.write(version.encode()))
+    legacy.unlink(missing_ok=True)
+
+    # отсчёт GC_GRACE для заменённого поколения – с момента замены
+    if previous and previous != version:
+        try:
+            os.utime(gen_dir / f"{previous}.json")
+        except FileNotFoundError:
+            pass
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def collect_garbage(bank_dir: Union[str, Path], keep: int = KEEP_GENERATIONS,
+                    grace: float = GC_GRACE) -> dict:
+    """Удаляет старые поколения и шарды, на которые они одни ссылались.
+
+    Сохраняются текущее поколение, ``keep`` самых новых и все, заменённые
+    менее ``grace`` секунд назад; ничейный шард удаляется, только если он
+    тоже старше ``grace`` (его мог только что записать параллельный сборщик).
+    Возвращает ``{"generations", "shards"}`` – сколько удалено.
+    """
+    bank_dir = Path(bank_dir)
+    current = current_generation(bank_dir)
+    now = time.time()
+
+    generations = sorted((bank_dir / GENERATIONS).glob("*.json"), key=_mtime, reverse=True)
+    live: set[str] = set()
+    if current is None:
+        live |= referenced_files(read_manifest(bank_dir) or {})
+    removed_gens = removed_shards = 0
+    for i, path in enumerate(generations):
+        if path.stem == current or i < keep or now - _mtime(path) < grace:
+            try:
+                with open(path, "rb") as fh:
+                    live |= referenced_files(json.load(fh))
+            except FileNotFoundError:
+                pass
+        else:
+            path.unlink(missing_ok=True)
+            removed_gens += 1
+
+    for shard in (bank_dir / SHARDS).glob("*.npy"):
+        if f"{SHARDS}/{shard.name}" not in live and now - _mtime(shard) >= grace:
+            shard.unlink(missing_ok=True)
+            removed_shards += 1
+    return {"generations": removed_gens, "shards": removed_shards}
+
+
+def iter_npz(npz_path: Union[str, Path]) -> Iterable[tuple[str, np.ndarray]]:
+    with np.load(npz_path, allow_pickle=False) as data:
+        for key in data.files:
+            yield key, data[key]
+
+
+def export_npz(npz_path: Union[str, Path], bank_dir: Union[str, Path] = BANK_DIR,
+               templates: int = 0) -> dict:
+    """Миграция: старый ``features.npz`` → шардированный банк.
+
+    ``templates`` > 0 – заодно построить до стольких усреднённых шаблонов на
+    слово (нужны для ``strategy="template"``; в сервисе они не строятся).
+    """
+    if not templates:
+        return write_bank(bank_dir, dict(iter_npz(npz_path)))
+    from audio.templates import build_templates
+    return write_bank(bank_dir, dict(iter_npz(npz_path)),
+                      templates=partial(build_templates, max_templates=templates),
+                      templates_key=f"dba{templates}")      # тот же ключ, что у preprocess_audio
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Reference feature bank tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_export = sub.add_parser("export", help="convert features.npz into a sharded bank")
+    p_export.add_argument("npz", type=Path, nargs="?", default=BASE_DIR / "features.npz")
+    p_export.add_argument("bank", type=Path, nargs="?", default=BANK_DIR)
+    p_export.add_argument("--templates", type=int, default=0, metavar="N",
+                          help="also build up to N averaged templates per word")
+
+    p_info = sub.add_parser("info", help="print bank summary")
+    p_info.add_argument("bank", type=Path, nargs="?", default=BANK_DIR)
+
+    p_gc = sub.add_parser("gc", help="remove superseded generations and unreferenced shards")
+    p_gc.add_argument("bank", type=Path, nargs="?", default=BANK_DIR)
+    p_gc.add_argument("--keep", type=int, default=KEEP_GENERATIONS)
+    p_gc.add_argument("--grace", type=float, default=GC_GRACE, help="seconds")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "export":
+        stats = export_npz(args.npz, args.bank, args.templates)
+        print(f"Exported {args.npz} → {args.bank}: {stats}")
+    elif args.cmd == "gc":
+        stats = collect_garbage(args.bank, args.keep, args.grace)
+        print(f"Removed {stats['generations']} generations, {stats['shards']} shards")
+    else:
+        manifest = read_manifest(args.bank)
+        if manifest is None:
+            raise SystemExit(f"No bank at {args.bank}")
+        words = manifest["words"]
+        generations = len(list((args.bank / GENERATIONS).glob("*.json")))
+        print(f"version {manifest['version']} ({generations} generations on disk), {len(words)} words, "
+              f"{sum(len(e['refs']) for e in words.values())} references, "
+              f"{sum(len(e['templates']['items']) for e in words.values() if 'templates' in e)} templates, "
+              f"dim {manifest['dim']}, {manifest.get('dtype', 'float32')}")
+
+
+if __name__ == "__main__":
+    main()
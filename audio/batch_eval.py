@@ -0,0 +1,245 @@
+"""Пакетная офлайн-оценка размеченных записей (калибровка ``DTW_LIMIT``).
+
+Вход – каталог записей. Слово берётся из имени файла (``<word>_<idx>.webm``,
+как ключи банка), метка – из имени родительского каталога::
+
+    recordings/
+        good/cat_0.webm
+        bad/cat_3.ogg
+
+либо из CSV ``--labels`` со столбцами ``path,word,label`` (пути относительно
+каталога). Записи оцениваются на всех ядрах постоянным пулом процессов, строки
+пишутся в результат по мере готовности::
+
+    python -m audio.batch_eval recordings/ --out scores.csv
+    python -m audio.batch_eval recordings/ --out scores.parquet --strategy template
+
+Повторный запуск с тем же ``--out`` пропускает уже оценённые файлы, так что
+прерванный прогон можно продолжить. ``.parquet`` – каталог part-файлов
+(нужен pyarrow), читается ``pandas.read_parquet``. В конце печатается доля
+записей каждой метки, прошедших пороги ``--limits``.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from audio.analyze import analyse_bytes
+from audio.bank_format import parse_key
+from audio.scoring import init_worker, score_features
+
+EXTENSIONS = {".webm", ".ogg", ".oga", ".wav", ".mp3", ".m4a", ".flac"}
+COLUMNS = ("path", "word", "label", "dtw", "error", "analyse_ms", "dtw_ms", "total_ms")
+LIMITS = (130, 120, 110)          # DTW_LIMIT для CEFR A/B/C (backend/routers/pronunciation.py)
+
+
+# ── input ────────────────────────────────────────────────────────────────────
+def discover(root: Path, labels: Optional[Path] = None) -> list[tuple[str, str, str]]:
+    """``[(путь относительно root, слово, метка), …]`` в стабильном порядке."""
+    if labels is not None:
+        with open(labels, newline="") as fh:
+            return [(row["path"], row["word"].lower(), row.get("label", ""))
+                    for row in csv.DictReader(fh)]
+    items = []
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() not in EXTENSIONS or not path.is_file():
+            continue
+        rel = path.relative_to(root)
+        word, _ = parse_key(path.name)
+        items.append((rel.as_posix(), word.lower(), rel.parent.as_posix() if rel.parent.parts else ""))
+    return items
+
+
+# ── output ───────────────────────────────────────────────────────────────────
+class _CsvSink:
+    """CSV, дописываемый построчно; недописанная последняя строка отбрасывается."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: set[str] = set()
+        if path.exists():
+            raw = path.read_bytes()
+            if raw and not raw.endswith(b"\n"):
+                with open(path, "r+b") as fh:
+                    fh.truncate(raw.rfind(b"\n") + 1)
+            with open(path, newline="") as fh:
+                self.done = {row["path"] for row in csv.DictReader(fh)}
+        fresh = not path.exists() or path.stat().st_size == 0
+        self._fh = open(path, "a", newline="")
+        self._writer = csv.DictWriter(self._fh, fieldnames=COLUMNS)
+        if fresh:
+            self._writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        self._writer.writerow(row)
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _ParquetSink:
+    """Каталог ``part-NNNNN.parquet``; каждые ``flush_rows`` строк – новый part."""
+
+    def __init__(self, path: Path, flush_rows: int = 1000):
+        try:
+            import pandas as pd
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pandas and pyarrow; use a .csv --out instead")
+        self._pd = pd
+        self.path = path
+        self.flush_rows = flush_rows
+        path.mkdir(parents=True, exist_ok=True)
+        parts = sorted(path.glob("part-*.parquet"))
+        self.done = set()
+        for part in parts:
+            self.done |= set(pd.read_parquet(part, columns=["path"])["path"])
+        self._next = len(parts)
+        self._rows: list[dict] = []
+
+    def write(self, row: dict) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.flush_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        frame = self._pd.DataFrame(self._rows, columns=COLUMNS)
+        tmp = self.path / f".part-{self._next:05d}.parquet"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, self.path / f"part-{self._next:05d}.parquet")
+        self._next += 1
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+
+
+def open_sink(path: Path):
+    return _ParquetSink(path) if path.suffix == ".parquet" else _CsvSink(path)
+
+
+# ── scoring (в процессах пула) ───────────────────────────────────────────────
+_root: Optional[Path] = None
+_bank: Optional[Path] = None
+_strategy = "min"
+_k: Optional[int] = None
+
+
+def _init_eval_worker(root: str, bank: Optional[str], strategy: str, k: Optional[int]) -> None:
+    global _root, _bank, _strategy, _k
+    _root, _bank, _strategy, _k = Path(root), Path(bank) if bank else None, strategy, k
+    init_worker(_bank)
+
+
+def _score_file(rel: str, word: str, label: str) -> dict:
+    row = {"path": rel, "word": word, "label": label, "dtw": None, "error": "",
+           "analyse_ms": None, "dtw_ms": None, "total_ms": None}
+    t0 = time.perf_counter()
+    try:
+        feat = analyse_bytes((_root / rel).read_bytes())
+        t1 = time.perf_counter()
+        row["analyse_ms"] = round((t1 - t0) * 1000, 2)
+        row["dtw"] = round(score_features(word, feat, _bank, _strategy, None, _k), 3)
+        row["dtw_ms"] = round((time.perf_counter() - t1) * 1000, 2)
+    except Exception as e:        # битый файл не должен ронять весь прогон
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return row
+
+
+def evaluate(root: Path, items: Sequence[tuple[str, str, str]], workers: int,
+             bank: Optional[Path] = None, strategy: str = "min", k: Optional[int] = None,
+             chunksize: int = 8) -> Iterator[dict]:
+    """Строки результата в порядке *items* по мере готовности."""
+    if not items:
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_eval_worker,
+                             initargs=(str(root), str(bank) if bank else None, strategy, k)) as pool:
+        try:
+            yield from pool.map(_score_file, *zip(*items), chunksize=chunksize)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+# ── summary ──────────────────────────────────────────────────────────────────
+def summarize(rows: Iterable[dict], limits: Sequence[float] = LIMITS) -> None:
+    by_label: dict[str, list[float]] = {}
+    errors = 0
+    for row in rows:
+        dtw = float(row["dtw"]) if row["dtw"] not in (None, "") else np.nan   # parquet: NaN
+        if np.isnan(dtw):
+            errors += 1
+            continue
+        by_label.setdefault(row["label"] or "-", []).append(dtw)
+
+    head = "".join(f"{'<%g' % lim:>8s}" for lim in limits)
+    print(f"{'label':12s} {'n':>7s}    p10     p50     p90{head}")
+    for label, scores in sorted(by_label.items()):
+        s = np.asarray(scores)
+        rates = "".join(f"{np.mean(s < lim):8.1%}" for lim in limits)
+        print(f"{label:12s} {len(s):7d} {np.percentile(s, 10):6.1f}  {np.percentile(s, 50):6.1f}  "
+              f"{np.percentile(s, 90):6.1f}{rates}")
+    if errors:
+        print(f"{errors} recordings failed (see the `error` column)")
+
+
+def read_rows(path: Path) -> list[dict]:
+    if path.suffix == ".parquet":
+        import pandas as pd
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="") as fh:
+        return list(csv.DictReader(fh))
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score a directory of labelled recordings against the bank")
+    parser.add_argument("root", type=Path, help="directory with recordings")
+    parser.add_argument("--out", type=Path, default=Path("scores.csv"), help=".csv or .parquet (resumable)")
+    parser.add_argument("--labels", type=Path, help="CSV with path,word,label (default: word from file "
+                                                    "name, label from parent directory)")
+    parser.add_argument("--bank", type=Path, default=None, help="bank directory or .npz (default: built bank)")
+    parser.add_argument("--strategy", default="min", choices=["min", "mean", "template"])
+    parser.add_argument("--k", type=int, default=None, help="prefilter top-k (default: exact)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--limits", type=float, nargs="+", default=list(LIMITS))
+    args = parser.parse_args(argv)
+
+    items = discover(args.root, args.labels)
+    sink = open_sink(args.out)
+    todo = [it for it in items if it[0] not in sink.done]
+    print(f"{len(items)} recordings, {len(items) - len(todo)} already scored, {len(todo)} to go")
+
+    t0 = time.perf_counter()
+    done = 0
+    try:
+        for row in evaluate(args.root, todo, args.workers, args.bank, args.strategy, args.k):
+            sink.write(row)
+            done += 1
+            if done % 500 == 0:
+                elapsed = time.perf_counter() - t0
+                print(f"  {done}/{len(todo)}  {done / elapsed:.1f} files/s")
+    except KeyboardInterrupt:
+        print(f"Interrupted after {done} files; rerun with the same --out to resume")
+        raise SystemExit(130)
+    finally:
+        sink.close()
+    if done:
+        elapsed = time.perf_counter() - t0
+        print(f"Scored {done} files in {elapsed:.1f}s ({done / elapsed:.1f} files/s) → {args.out}")
+
+    summarize(read_rows(args.out), args.limits)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Офлайн-бенчмарк конвейера оценки произношения.
+
+Синтезирует детерминированные записи (тоны, шум, «речеподобный» сигнал)
+и синтетический банк эталонов, меряет каждую стадию (p50/p95/p99, пик
+памяти) и пропускную способность при разном числе процессов. Результат –
+JSON, который можно сравнить с предыдущим прогоном::
+
+    python -m audio.benchmark --out bench.json
+    python -m audio.benchmark --out new.json --baseline bench.json --tolerance 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import soundfile as sf
+
+from audio.analyze import analyse_bytes, analyse_signal, extract_mfcc, compute_dtw
+from audio.bank_format import write_bank
+from audio.decode import SR, decode_bytes
+from audio.dtw import dtw_batch
+from audio.feature_bank import get_feature_bank
+from audio.scoring import score_features
+
+LENGTHS = (0.5, 1.0, 2.0, 4.0)   # секунды
+KINDS = ("tone", "noise", "speech")
+
+
+# ── synthetic data ───────────────────────────────────────────────────────────
+def synth(kind: str, seconds: float, seed: int = 0, sr: int = SR) -> np.ndarray:
+    """Детерминированный тестовый сигнал с тишиной по краям."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    if kind == "tone":
+        y = np.sin(2 * np.pi * (220 + 40 * (seed % 7)) * t)
+    elif kind == "noise":
+        y = rng.standard_normal(n)
+    elif kind == "speech":
+        # гармоники с плавающим f0 и «слоговой» огибающей ~4 Гц
+        f0 = 110 + 30 * (seed % 5) + 15 * np.sin(2 * np.pi * 1.5 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        y = sum(np.sin(k * phase) / k for k in range(1, 12))
+        y *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t + seed) ** 2
+        y += 0.02 * rng.standard_normal(n)
+    else:
+        raise ValueError(kind)
+    y *= np.hanning(n)
+    pad = np.zeros(sr // 5)
+    y = np.concatenate([pad, y, pad])
+    return (0.5 * y / (np.abs(y).max() + 1e-9)).astype(np.float32)
+
+
+def to_wav(y: np.ndarray, sr: int = SR) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def build_bank(bank_dir: Path, words: int, refs_per_word: int) -> list[str]:
+    """Синтетический банк: слово = речеподобный сигнал со своим seed."""
+    features = {}
+    names = [f"word{i}" for i in range(words)]
+    for w, name in enumerate(names):
+        for r in range(refs_per_word):
+            y = synth("speech", 0.6 + 0.1 * (r % 4), seed=w * 31 + r)
+            features[f"{name}_{r}.ogg"] = analyse_signal(y, SR)
+    write_bank(bank_dir, features)
+    return names
+
+
+# ── measurement ──────────────────────────────────────────────────────────────
+def percentiles(samples: list[float]) -> dict:
+    arr = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def measure(fn: Callable[[], object], repeats: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    # пик памяти – отдельным прогоном, tracemalloc искажает время
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    res = percentiles(times)
+    res["peak_kib"] = round(peak / 1024, 1)
+    return res
+
+
+def run_stages(bank_dir: Path, words: list[str], repeats: int) -> dict:
+    bank = get_feature_bank(bank_dir)
+    word = words[0]
+    refs = bank.get(word)
+    stages: dict[str, dict] = {}
+
+    for kind in KINDS:
+        for seconds in LENGTHS:
+            y = synth(kind, seconds, seed=7)
+            data = to_wav(y)
+            tag = f"{kind}_{seconds:g}s"
+            stages[f"decode/{tag}"] = measure(lambda: decode_bytes(data), repeats)
+            try:
+                feat = analyse_signal(y, SR)
+            except ValueError:      # NoSpeech – тоже полезный замер быстрого выхода
+                feat = None
+            stages[f"analyse/{tag}"] = measure(lambda: _safe(analyse_signal, y, SR), repeats)
+            stages[f"extract_mfcc/{tag}"] = measure(lambda: extract_mfcc(y, SR), repeats)
+            if feat is None:
+                continue
+            stages[f"compute_dtw/{tag}"] = measure(lambda: [compute_dtw(r, feat) for r in refs], repeats)
+            stages[f"dtw_batch/{tag}"] = measure(lambda: dtw_batch(feat, refs), repeats)
+            stages[f"evaluate/{tag}"] = measure(
+                lambda: score_features(word, analyse_bytes(data), bank_dir), repeats)
+    return stages
+
+
+def _safe(fn, *args):
+    try:
+        return fn(*args)
+    except ValueError:
+        return None
+
+
+# ── throughput ───────────────────────────────────────────────────────────────
+_bench_bank: Optional[Path] = None
+
+
+def _init_bench_worker(bank_dir: str) -> None:
+    global _bench_bank
+    _bench_bank = Path(bank_dir)
+    get_feature_bank(_bench_bank).load()
+    dtw_batch(np.zeros((39, 2), np.float32), [np.zeros((39, 2), np.float32)])
+
+
+def _bench_job(word: str, data: bytes) -> float:
+    return score_features(word, analyse_bytes(data), _bench_bank)
+
+
+def run_throughput(bank_dir: Path, words: list[str], levels: list[int], jobs: int) -> list[dict]:
+    payloads = [(words[i % len(words)], to_wav(synth("speech", 1.0, seed=i))) for i in range(jobs)]
+    out = []
+    for workers in levels:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_bench_worker,
+                                 initargs=(str(bank_dir),)) as pool:
+            list(pool.map(_bench_job, *zip(*payloads[:workers])))   # прогрев
+            t0 = time.perf_counter()
+            list(pool.map(_bench_job, *zip(*payloads)))
+            elapsed = time.perf_counter() - t0
+        out.append({"workers": workers, "jobs": jobs,
+                    "seconds": round(elapsed, 3), "jobs_per_s": round(jobs / elapsed, 2)})
+        print(f"  {workers} workers: {jobs / elapsed:.1f} evaluations/s")
+    return out
+
+
+# ── report / compare ─────────────────────────────────────────────────────────
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Стадии, чей p95 вырос больше чем на *tolerance* (доля)."""
+    regressions = []
+    for name, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or not base["p95_ms"]:
+            continue
+        ratio = cur["p95_ms"] / base["p95_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f} → {cur['p95_ms']:.2f} ms (×{ratio:.2f})")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pronunciation pipeline benchmark")
+    parser.add_argument("--out", type=Path, default=Path("bench.json"))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--words", type=int, default=10)
+    parser.add_argument("--refs", type=int, default=5, help="references per word")
+    parser.add_argument("--concurrency", default=",".join(
+        str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1}) if n <= (os.cpu_count() or 1)))
+    parser.add_argument("--jobs", type=int, default=40, help="evaluations per concurrency level")
+    parser.add_argument("--baseline", type=Path, help="previous JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bank_dir = Path(tmp) / "bank"
+        print(f"Building synthetic bank: {args.words} words × {args.refs} refs …")
+        words = build_bank(bank_dir, args.words, args.refs)
+
+        print("Measuring stages …")
+        stages = run_stages(bank_dir, words, args.repeats)
+        print("Measuring throughput …")
+        levels = [int(x) for x in args.concurrency.split(",") if x]
+        throughput = run_throughput(bank_dir, words, levels, args.jobs)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {"repeats": args.repeats, "words": args.words, "refs": args.refs},
+        },
+        "stages": stages,
+        "throughput": throughput,
+    }
+    args.out.write_text(json.dumps(report, indent=2))
+    for name, st in stages.items():
+        print(f"  {name:32s} p50 {st['p50_ms']:8.2f}  p95 {st['p95_ms']:8.2f}  "
+              f"p99 {st['p99_ms']:8.2f} ms  peak {st['peak_kib']:8.1f} KiB")
+    print("Saved", args.out)
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Mapping
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.models import Word
+
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class SyncResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged"
+
+
+def upsert_audio_stmt(rows: list[dict], keep_max: bool = True):
+    """``INSERT … ON CONFLICT (english_word) DO UPDATE SET audio = …`` для пачки слов.
+
+    * ``keep_max=True`` – ``audio = GREATEST(words.audio, excluded.audio)``,
+    * ``keep_max=False`` – значение из *rows* перезаписывает текущее.
+
+    Строки без изменений не трогаются; RETURNING отдаёт ``inserted``
+    (``xmax = 0`` у только что вставленной строки).
+    """
+    stmt = insert(Word).values(rows)
+    new_audio = (
+        func.greatest(func.coalesce(Word.audio, 0), stmt.excluded.audio)
+        if keep_max else stmt.excluded.audio
+    )
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=[Word.english_word],
+            set_={"audio": new_audio},
+            where=Word.audio.is_distinct_from(new_audio),
+        )
+        .returning(literal_column("(xmax = 0)").label("inserted"))
+    )
+
+
+async def sync_audio_counts(
+    session: AsyncSession,
+    counts: Mapping[str, int],
+    *,
+    keep_max: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> SyncResult:
+    """Синхронизирует ``words.audio`` с *counts* – один запрос на пачку слов."""
+    result = SyncResult()
+    items = sorted(counts.items())
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        rows = [{"english_word": word, "audio": cnt} for word, cnt in chunk]
+        flags = (await session.execute(upsert_audio_stmt(rows, keep_max))).scalars().all()
+        inserted = sum(1 for f in flags if f)
+        result.inserted += inserted
+        result.updated += len(flags) - inserted
+        result.unchanged += len(chunk) - len(flags)
+    await session.commit()
+    return result
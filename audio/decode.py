@@ -0,0 +1,211 @@
+"""Декодирование загруженных записей, по возможности прямо из памяти.
+
+* WAV/OGG/FLAC читаются libsndfile'ом из ``BytesIO`` в текущем процессе;
+* всё остальное (webm/opus из браузера) уходит по pipe в заранее
+  запущенный ffmpeg, который сразу отдаёт 16 кГц mono PCM16;
+* MP4/M4A (Safari/iOS MediaRecorder) пишутся во временный файл: moov atom
+  у них в конце, и из несикабельного pipe ffmpeg их не демультиплексирует.
+  Туда же откатываемся, если ffmpeg не справился с pipe.
+"""
+from __future__ import annotations
+
+import atexit
+import io
+import logging
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+SR = 16000
+MAX_SECONDS = 15.0          # длиннее – это уже не одно слово
+DECODE_TIMEOUT = 10.0       # секунд на один ffmpeg
+
+
+class DecodeError(RuntimeError):
+    """Не удалось декодировать запись."""
+
+
+class AudioTooLong(ValueError):
+    """Запись длиннее допустимого."""
+
+
+def _to_target(y: np.ndarray, sr_in: int, sr: int) -> np.ndarray:
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    if sr_in != sr:
+        y = librosa.resample(y, orig_sr=sr_in, target_sr=sr)
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+def _is_mp4(data: bytes) -> bool:
+    """ISO BMFF (mp4/m4a/mov): первый бокс – ``ftyp``."""
+    return data[4:8] == b"ftyp"
+
+
+def _decode_soundfile(data: bytes, sr: int, max_seconds: float) -> Optional[np.ndarray]:
+    """Быстрый путь через libsndfile; ``None`` если формат ему не знаком."""
+    try:
+        with sf.SoundFile(io.BytesIO(data)) as f:
+            # длительность известна из заголовка – проверяем до декодирования
+            if f.frames > max_seconds * f.samplerate:
+                raise AudioTooLong(f"Audio is longer than {max_seconds:g} s")
+            y = f.read(dtype="float32")
+            sr_in = f.samplerate
+    except (sf.LibsndfileError, RuntimeError):
+        return None
+    return _to_target(y, sr_in, sr)
+
+
+class DecoderPool:
+    """Пул «тёплых» ffmpeg: процессы запущены заранее и ждут данные на stdin.
+
+    Каждый процесс обслуживает ровно одну запись; замена запускается в
+    фоне, так что на пути запроса fork/exec не происходит.
+    """
+
+    def __init__(self, size: int = 2, sr: int = SR, max_seconds: float = MAX_SECONDS,
+                 timeout: float = DECODE_TIMEOUT):
+        self.size = size
+        self.sr = sr
+        self.max_seconds = max_seconds
+        self.timeout = timeout
+        self._idle: deque[subprocess.Popen] = deque()
+        self._lock = threading.Lock()
+        self._spawner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ffmpeg-spawn")
+        self._available = True
+
+    def _cmd(self, src: str = "pipe:0") -> list[str]:
+        return [
+            "ffmpeg", "-v", "error", "-i", src,
+            # +1 кадр сверх лимита, чтобы отличить «ровно лимит» от «длиннее»
+            "-t", f"{self.max_seconds + 1 / self.sr:.6f}",
+            "-ar", str(self.sr), "-ac", "1", "-f", "s16le", "pipe:1",
+        ]
+
+    def _spawn(self) -> Optional[subprocess.Popen]:
+        try:
+            return subprocess.Popen(self._cmd(), stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            if self._available:
+                logging.error("ffmpeg not found, only libsndfile formats can be decoded")
+            self._available = False
+            return None
+
+    def _refill(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._idle) >= self.size:
+                    return
+            proc = self._spawn()
+            if proc is None:
+                return
+            with self._lock:
+                self._idle.append(proc)
+
+    def warm(self) -> None:
+        self._refill()
+
+    @staticmethod
+    def _reap(proc: subprocess.Popen) -> None:
+        """Закрыть pipe'ы и дождаться процесса, чтобы не оставлять зомби."""
+        for f in (proc.stdin, proc.stdout, proc.stderr):
+            if f is not None:
+                f.close()
+        proc.wait()
+
+    def _take(self) -> Optional[subprocess.Popen]:
+        dead = []
+        with self._lock:
+            while self._idle:
+                proc = self._idle.popleft()
+                if proc.poll() is None:
+                    break
+                dead.append(proc)
+            else:
+                proc = None
+        for d in dead:
+            self._reap(d)
+        self._spawner.submit(self._refill)
+        return proc or self._spawn()
+
+    def _decode_pipe(self, data: bytes) -> Optional[bytes]:
+        """PCM из тёплого ffmpeg; ``None`` если ffmpeg не справился с pipe."""
+        proc = self._take()
+        if proc is None:
+            raise DecodeError("ffmpeg is not available")
+        try:
+            out, err = proc.communicate(data, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise DecodeError("ffmpeg timed out")
+        if proc.returncode != 0 or not out:
+            logging.warning("ffmpeg failed on pipe, retrying from a temp file: "
+                            + (err.decode(errors="replace").strip() or f"exit code {proc.returncode}"))
+            return None
+        return out
+
+    def _decode_file(self, data: bytes) -> bytes:
+        """Через сикабельный временный файл – холодный запуск ffmpeg."""
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            try:
+                res = subprocess.run(self._cmd(f.name), stdin=subprocess.DEVNULL,
+                                     capture_output=True, timeout=self.timeout)
+            except FileNotFoundError:
+                raise DecodeError("ffmpeg is not available")
+            except subprocess.TimeoutExpired:
+                raise DecodeError("ffmpeg timed out")
+        if res.returncode != 0 or not res.stdout:
+            raise DecodeError(res.stderr.decode(errors="replace").strip() or "ffmpeg failed")
+        return res.stdout
+
+    def decode(self, data: bytes) -> np.ndarray:
+        out = None if _is_mp4(data) else self._decode_pipe(data)
+        if out is None:
+            out = self._decode_file(data)
+
+        pcm = np.frombuffer(out, dtype=np.int16)
+        if len(pcm) > self.max_seconds * self.sr:
+            raise AudioTooLong(f"Audio is longer than {self.max_seconds:g} s")
+        return pcm.astype(np.float32) / 32768.0
+
+    def close(self) -> None:
+        self._spawner.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for proc in idle:
+            proc.kill()
+            self._reap(proc)
+
+
+_pool: Optional[DecoderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_decoder_pool() -> DecoderPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DecoderPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def decode_bytes(data: bytes) -> np.ndarray:
+    """Байты загрузки → float32 mono сигнал 16 кГц."""
+    if not data:
+        raise DecodeError("Empty audio")
+    y = _decode_soundfile(data, SR, MAX_SECONDS)
+    if y is None:
+        y = get_decoder_pool().decode(data)
+    return y
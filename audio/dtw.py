@@ -0,0 +1,248 @@
+"""DTW-движок для сравнения MFCC(+Δ, ΔΔ) признаков формы (39, T).
+
+Считает ту же стоимость, что ``librosa.sequence.dtw`` (евклидова метрика,
+шаги (1,1), (0,1), (1,0), равные веса) и ту же нормировку на длину
+оптимального пути, но без полной матрицы стоимостей и без бэктрекинга:
+длина пути протягивается вместе с накопленной стоимостью.
+"""
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numba
+import numpy as np
+
+INF = np.inf
+
+
+@numba.njit(cache=True)
+def _dtw_core(X, Y, lo, hi, abandon):
+    """X: (N, d) эталон, Y: (M, d) тест, lo/hi – окно столбцов для каждой строки.
+
+    Возвращает (нормированная стоимость, длина пути); ``(inf, 0)`` если
+    расчёт прерван: нижняя граница уже не лучше ``abandon``.
+    """
+    N, M, dim = X.shape[0], Y.shape[0], X.shape[1]
+    max_len = N + M - 1
+    prev_D = np.full(M, np.inf)
+    prev_L = np.zeros(M, np.int64)
+    cur_D = np.full(M, np.inf)
+    cur_L = np.zeros(M, np.int64)
+
+    for i in range(N):
+        cur_D[:] = np.inf
+        row_min = np.inf
+        for j in range(lo[i], hi[i] + 1):
+            acc = 0.0
+            for k in range(dim):
+                diff = np.float64(X[i, k]) - np.float64(Y[j, k])
+                acc += diff * diff
+            c = np.sqrt(acc)
+
+            if i == 0 and j == 0:
+                d = c
+                length = 1
+            else:
+                # порядок шагов и строгое «<» как в librosa: при равенстве
+                # побеждает диагональ, затем (0,1), затем (1,0)
+                d = np.inf
+                length = 0
+                if i > 0 and j > 0 and prev_D[j - 1] + c < d:
+                    d = prev_D[j - 1] + c
+                    length = prev_L[j - 1] + 1
+                if j > 0 and cur_D[j - 1] + c < d:
+                    d = cur_D[j - 1] + c
+                    length = cur_L[j - 1] + 1
+                if i > 0 and prev_D[j] + c < d:
+                    d = prev_D[j] + c
+                    length = prev_L[j] + 1
+            cur_D[j] = d
+            cur_L[j] = length
+            if d < row_min:
+                row_min = d
+
+        # любой путь проходит через каждую строку, а стоимость вдоль пути
+        # не убывает → row_min / max_len – нижняя граница итогового score
+        if row_min / max_len >= abandon:
+            return np.inf, 0
+
+        prev_D, cur_D = cur_D, prev_D
+        prev_L, cur_L = cur_L, prev_L
+
+    if prev_L[M - 1] == 0:
+        return np.inf, 0
+    return prev_D[M - 1] / prev_L[M - 1], prev_L[M - 1]
+
+
+def band_window(n: int, m: int, band: Optional[str] = None,
+                radius: float = 0.1, slope: float = 2.0) -> tuple[np.ndarray, np.ndarray]:
+    """Окно допустимых столбцов ``[lo[i], hi[i]]`` для каждой строки.
+
+    * ``band=None`` – без ограничений,
+    * ``"sakoe"`` – полоса Сакоэ–Чиба вокруг (масштабированной) диагонали,
+      ``radius`` – доля от max(n, m) (или число кадров, если >= 1),
+    * ``"itakura"`` – параллелограмм Итакуры с максимальным наклоном ``slope``.
+    """
+    rows = np.arange(n, dtype=np.float64)
+    if band is None:
+        lo = np.zeros(n, np.int64)
+        hi = np.full(n, m - 1, np.int64)
+    elif band == "sakoe":
+        r = radius if radius >= 1 else radius * max(n, m)
+        r = max(r, 1.0)
+        centre = rows * (m - 1) / max(n - 1, 1)
+        lo = np.floor(centre - r).astype(np.int64)
+        hi = np.ceil(centre + r).astype(np.int64)
+    elif band == "itakura":
+        # наклон не меньше отношения длин, иначе параллелограмм пуст
+        s = max(slope, 1.0001 * max(n, m) / max(min(n, m), 1))
+        tail = (n - 1) - rows
+        lo = np.ceil(np.maximum(rows / s, (m - 1) - s * tail)).astype(np.int64)
+        hi = np.floor(np.minimum(rows * s, (m - 1) - tail / s)).astype(np.int64)
+    else:
+        raise ValueError(f"Unknown DTW band `{band}`")
+
+    lo = np.clip(lo, 0, m - 1)
+    hi = np.clip(hi, 0, m - 1)
+    lo[0], hi[-1] = 0, m - 1
+    # окно должно быть монотонным и связным, иначе конец недостижим
+    hi = np.maximum.accumulate(hi)
+    lo = np.minimum.accumulate(lo[::-1])[::-1]
+    lo[1:] = np.minimum(lo[1:], hi[:-1] + 1)
+    hi = np.maximum(hi, lo)
+    return lo, hi
+
+
+def _frames(feat: np.ndarray) -> np.ndarray:
+    # (39, T) → (T, 39) в C-порядке: кадр – непрерывная строка
+    return np.ascontiguousarray(feat.T)
+
+
+def dtw_cost(features_ref: np.ndarray, features_test: np.ndarray, *,
+             band: Optional[str] = None, radius: float = 0.1, slope: float = 2.0,
+             abandon_above: float = INF) -> float:
+    """Нормированная DTW-стоимость (как ``compute_dtw(...)[0]``).
+
+    Возвращает ``inf``, если стоимость заведомо не меньше ``abandon_above``.
+    """
+    X, Y = _frames(features_ref), _frames(features_test)
+    if X.shape[0] == 0 or Y.shape[0] == 0:
+        return INF
+    lo, hi = band_window(X.shape[0], Y.shape[0], band, radius, slope)
+    cost, _ = _dtw_core(X, Y, lo, hi, abandon_above)
+    return float(cost)
+
+
+def _lb_kim(X: np.ndarray, Y: np.ndarray) -> float:
+    # первая и последняя пары кадров лежат на любом пути
+    first = np.linalg.norm(X[0].astype(np.float64) - Y[0])
+    last = np.linalg.norm(X[-1].astype(np.float64) - Y[-1])
+    return (first + last) / (X.shape[0] + Y.shape[0] - 1)
+
+
+def dtw_batch(features_test: np.ndarray, refs: Sequence[np.ndarray], *,
+              strategy: str = "min", band: Optional[str] = None,
+              radius: float = 0.1, slope: float = 2.0) -> tuple[float, list[float]]:
+    """Оценивает одну тестовую запись против N эталонов за один вызов.
+
+    Возвращает ``(score, costs)``. При ``strategy="min"`` эталоны идут по
+    возрастанию нижней границы, а расчёт каждого прерывается, как только он
+    не может улучшить лучший результат (такие стоимости равны ``inf``).
+    """
+    if not refs:
+        raise ValueError("No reference features given")
+    Y = _frames(features_test)
+    if Y.shape[0] == 0:
+        return INF, [INF] * len(refs)
+
+    frames = [_frames(r) for r in refs]
+    costs = [INF] * len(refs)
+    order = range(len(refs))
+    early = strategy == "min"
+    if early:
+        order = sorted(order, key=lambda i: _lb_kim(frames[i], Y) if frames[i].shape[0] else INF)
+
+    best = INF
+    for i in order:
+        X = frames[i]
+        if X.shape[0] == 0:
+            continue
+        lo, hi = band_window(X.shape[0], Y.shape[0], band, radius, slope)
+        cost, _ = _dtw_core(X, Y, lo, hi, best if early else INF)
+        costs[i] = float(cost)
+        best = min(best, costs[i])
+
+    score = best if early else float(np.mean(costs))
+    return score, costs
+
+
+# ── online DTW ───────────────────────────────────────────────────────────────
+@numba.njit(cache=True)
+def _dtw_column(X, y, prev_D, prev_L, D, L, first):
+    """Один новый тестовый кадр ``y``: столбец накопленных стоимостей.
+
+    Та же рекуррентность и тот же порядок шагов, что в ``_dtw_core``, только
+    по столбцам: (i-1, j-1), затем (i, j-1), затем (i-1, j).
+    """
+    N, dim = X.shape[0], X.shape[1]
+    for i in range(N):
+        acc = 0.0
+        for k in range(dim):
+            diff = np.float64(X[i, k]) - np.float64(y[k])
+            acc += diff * diff
+        c = np.sqrt(acc)
+
+        if first:
+            if i == 0:
+                D[i], L[i] = c, 1
+            else:
+                D[i], L[i] = D[i - 1] + c, L[i - 1] + 1
+            continue
+        d = np.inf
+        length = 0
+        if i > 0 and prev_D[i - 1] + c < d:
+            d = prev_D[i - 1] + c
+            length = prev_L[i - 1] + 1
+        if prev_D[i] + c < d:
+            d = prev_D[i] + c
+            length = prev_L[i] + 1
+        if i > 0 and D[i - 1] + c < d:
+            d = D[i - 1] + c
+            length = L[i - 1] + 1
+        D[i], L[i] = d, length
+
+
+class OnlineDTW:
+    """DTW против набора эталонов, тестовая запись приходит по кадрам.
+
+    Хранит только последний столбец матрицы для каждого эталона, так что
+    ``extend`` стоит O(ΣN) на кадр. ``cost()`` – нормированная стоимость
+    «если запись закончилась сейчас» (как ``dtw_batch`` по уже пришедшим
+    кадрам, без полосы и раннего прерывания).
+    """
+
+    def __init__(self, refs: Sequence[np.ndarray]):
+        self._refs = [_frames(r) for r in refs if r.shape[1]]
+        self._D = [np.full(len(X), INF) for X in self._refs]
+        self._L = [np.zeros(len(X), np.int64) for X in self._refs]
+        self.frames = 0
+
+    def extend(self, features: np.ndarray) -> None:
+        """Добавляет кадры ``features`` формы (39, k)."""
+        for y in _frames(features):
+            for n, X in enumerate(self._refs):
+                D, L = np.empty_like(self._D[n]), np.empty_like(self._L[n])
+                _dtw_column(X, y, self._D[n], self._L[n], D, L, self.frames == 0)
+                self._D[n], self._L[n] = D, L
+            self.frames += 1
+
+    def costs(self) -> list[float]:
+        if not self.frames:
+            return [INF] * len(self._refs)
+        return [float(D[-1] / L[-1]) for D, L in zip(self._D, self._L)]
+
+    def cost(self, strategy: str = "min") -> float:
+        costs = self.costs()
+        if not costs:
+            return INF
+        return min(costs) if strategy == "min" else float(np.mean(costs))
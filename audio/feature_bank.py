@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from audio.bank_format import BANK_DIR, bank_exists, current_generation, export_npz, group_by_word, \
+    iter_npz, open_shard, open_quant, open_summary, open_templates, read_manifest, referenced_files, shard_refs, \
+    template_refs, watch_path
+from audio.prefilter import summarize_all
+
+BASE_DIR = Path(__file__).resolve().parent
+FEATURES_NPZ = BASE_DIR / "features.npz"      # старый формат (до audio/bank_format.py)
+
+
+class _ReloadingBank:
+    """Общая часть банков: ленивая загрузка и перечитывание при изменении файла."""
+
+    def __init__(self, path: Union[str, Path], check_interval: float = 5.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._stamp: tuple[int, int] | None = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    # файл, по изменению которого банк перечитывается
+    def _watched(self) -> Path:
+        return self.path
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self._watched())
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    def load(self) -> None:
+        """(Пере)загружает банк и атомарно подменяет индекс."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None:
+                logging.warning("Feature bank %s not found", self.path)
+                self._clear()
+            else:
+                self._read()
+            self._stamp, self._loaded = stamp, True
+            self._checked_at = time.monotonic()
+
+    def _maybe_reload(self) -> None:
+        if not self._loaded:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if self._file_stamp() != self._stamp:
+            self.load()
+
+    def get(self, word: str) -> list[np.ndarray]:
+        """Все эталоны слова (пустой список, если их нет)."""
+        self._maybe_reload()
+        return self._lookup(word.lower())
+
+    def _lookup(self, word: str) -> list[np.ndarray]:
+        raise NotImplementedError
+
+    def summaries(self, word: str) -> np.ndarray:
+        """Конспекты эталонов слова (n, L, 39) для предотбора (audio/prefilter.py)."""
+        self._maybe_reload()
+        return self._lookup_summaries(word.lower())
+
+    def _lookup_summaries(self, word: str) -> np.ndarray:
+        return summarize_all(self._lookup(word))
+
+    def templates(self, word: str) -> list[tuple[np.ndarray, dict]]:
+        """Усреднённые шаблоны слова ``[(признаки (39, T), {"members", "spread"}), …]``."""
+        self._maybe_reload()
+        return self._lookup_templates(word.lower())
+
+    def _lookup_templates(self, word: str) -> list[tuple[np.ndarray, dict]]:
+        # шаблоны строятся только при сборке банка (pairwise DTW + DBA слишком
+        # дороги для запроса): preprocess_audio --templates / bank_format export --templates
+        return []
+
+    def words(self) -> list[str]:
+        self._maybe_reload()
+        return self._words()
+
+    def _words(self) -> list[str]:
+        raise NotImplementedError
+
+    def __contains__(self, word: str) -> bool:
+        return bool(self.get(word))
+
+    @property
+    def version(self) -> str:
+        """Идентификатор текущего содержимого банка."""
+        self._maybe_reload()
+        if self._stamp is None:
+            return "empty"
+        return f"{self._stamp[0]:x}-{self._stamp[1]:x}"
+
+    @property
+    def published_version(self) -> str:
+        """Версия банка на диске – без (пере)загрузки, один ``stat``.
+
+        Годится для ключей кэша в процессе, который сам не считает: процессы
+        пула переключаются на ту же версию не позже чем через ``check_interval``.
+        """
+        stamp = self._file_stamp()
+        return "empty" if stamp is None else f"{stamp[0]:x}-{stamp[1]:x}"
+
+
+class FeatureBank(_ReloadingBank):
+    """Резидентный банк эталонных признаков из ``features.npz``.
+
+    * загружает архив один раз (или лениво при первом обращении),
+    * держит индекс ``word → [матрицы (39, T)]`` в виде непрерывных float32,
+    * перечитывает архив, если файл на диске изменился (mtime/size).
+    """
+
+    def __init__(self, path: Union[str, Path] = FEATURES_NPZ, check_interval: float = 5.0):
+        super().__init__(path, check_interval)
+        self._index: dict[str, list[np.ndarray]] = {}
+        self._summaries: dict[str, np.ndarray] = {}
+
+    def _clear(self) -> None:
+        self._index, self._summaries = {}, {}
+
+    def _read(self) -> None:
+        grouped = group_by_word(dict(iter_npz(self.path)))
+        self._index = {
+            word: [np.ascontiguousarray(f, dtype=np.float32) for _, f in items]
+            for word, items in grouped.items()
+        }
+        self._summaries = {word: summarize_all(refs) for word, refs in self._index.items()}
+        logging.info("Feature bank loaded: %d words, %d references",
+                     len(self._index), sum(len(v) for v in self._index.values()))
+
+    def _lookup(self, word: str) -> list[np.ndarray]:
+        return self._index.get(word, [])
+
+    def _lookup_summaries(self, word: str) -> np.ndarray:
+        return self._summaries.get(word, summarize_all([]))
+
+    def _words(self) -> list[str]:
+        return sorted(self._index)
+
+
+class ShardedFeatureBank(_ReloadingBank):
+    """Банк в формате ``audio/bank_format.py``: при открытии читается только
+    manifest текущего поколения, шарды слов mmap'ятся по требованию (LRU
+    открытых шардов). Переключение ``CURRENT`` замечается не позже чем через
+    ``check_interval`` секунд."""
+
+    def __init__(self, path: Union[str, Path] = BANK_DIR, check_interval: float = 5.0,
+                 max_open_shards: int = 4096):
+        super().__init__(path, check_interval)
+        self.max_open_shards = max_open_shards
+        self._manifest: dict = {}
+        self._shards: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._shards_lock = threading.Lock()
+
+    def _watched(self) -> Path:
+        return watch_path(self.path)
+
+    def _clear(self) -> None:
+        self._manifest, self._shards = {}, OrderedDict()
+
+    def _read(self) -> None:
+        manifest = read_manifest(self.path) or {}
+        # открытые шарды переживают перезагрузку: имя шарда = хэш содержимого
+        live = referenced_files(manifest)
+        with self._shards_lock:
+            self._shards = OrderedDict((k, v) for k, v in self._shards.items() if k in live)
+        self._manifest = manifest
+        logging.info("Feature bank %s opened: version %s, %d words",
+                     self.path, manifest.get("version"), len(manifest.get("words", {})))
+
+    def _shard(self, entry: dict, name: Optional[str] = None, opener=open_shard) -> np.ndarray:
+        """mmap файла *name* (по умолчанию – шард эталонов) через LRU открытых."""
+        name = name or entry["shard"]
+        with self._shards_lock:
+            shard = self._shards.get(name)
+            if shard is not None:
+                self._shards.move_to_end(name)
+                return shard
+        shard = opener(self.path, entry)
+        with self._shards_lock:
+            self._shards[name] = shard
+            while len(self._shards) > self.max_open_shards:
+                self._shards.popitem(last=False)
+        return shard
+
+    def _lookup(self, word: str) -> list[np.ndarray]:
+        entry = self._manifest.get("words", {}).get(word)
+        if not entry:
+            return []
+        quant = self._shard(entry, entry["quant"], open_quant) if "quant" in entry else None
+        return shard_refs(self._shard(entry), entry, quant)
+
+    def _lookup_summaries(self, word: str) -> np.ndarray:
+        entry = self._manifest.get("words", {}).get(word)
+        if entry and "summary" in entry:
+            return self._shard(entry, entry["summary"], open_summary)
+        return super()._lookup_summaries(word)     # банк собран до предотбора
+
+    def _lookup_templates(self, word: str) -> list[tuple[np.ndarray, dict]]:
+        entry = self._manifest.get("words", {}).get(word)
+        if entry and "templates" in entry:
+            return template_refs(self._shard(entry, entry["templates"]["shard"], open_templates), entry)
+        return super()._lookup_templates(word)
+
+    def _words(self) -> list[str]:
+        return sorted(self._manifest.get("words", {}))
+
+    @property
+    def version(self) -> str:
+        self._maybe_reload()
+        return self._manifest.get("version", "empty")
+
+    @property
+    def published_version(self) -> str:
+        # CURRENT хранит версию опубликованного поколения; банки без него – как у базового
+        return current_generation(self.path) or super().published_version
+
+
+_banks: dict[Path, _ReloadingBank] = {}
+_banks_lock = threading.Lock()
+
+
+def default_bank_path() -> Path:
+    """Шардированный банк, если он собран, иначе старый ``features.npz``."""
+    return BANK_DIR if bank_exists(BANK_DIR) else FEATURES_NPZ
+
+
+def publish_npz(npz_path: Union[str, Path] = FEATURES_NPZ, bank_dir: Union[str, Path] = BANK_DIR) -> bool:
+    """Публикует ``features.npz`` шардированным банком, если банк ещё не собран.
+
+    Тогда все процессы (API, воркеры пула, другие воркеры uvicorn) mmap'ят
+    одни и те же шарды вместо того, чтобы держать по копии архива в памяти.
+    Несколько процессов могут вызвать это одновременно: шарды адресуются
+    хэшем и пишутся атомарно, итог одинаков.
+    """
+    npz_path, bank_dir = Path(npz_path), Path(bank_dir)
+    if bank_exists(bank_dir) or not npz_path.exists():
+        return False
+    stats = export_npz(npz_path, bank_dir)
+    logging.info("Published %s into %s: %s", npz_path, bank_dir, stats)
+    return True
+
+
+def get_feature_bank(path: Optional[Union[str, Path]] = None) -> _ReloadingBank:
+    """Процессный синглтон банка для *path* (каталог банка или .npz)."""
+    path = Path(path or default_bank_path()).resolve()
+    with _banks_lock:
+        bank = _banks.get(path)
+        if bank is None:
+            cls = ShardedFeatureBank if path.is_dir() or path.suffix != ".npz" else FeatureBank
+            bank = _banks[path] = cls(path)
+        return bank
@@ -0,0 +1,142 @@
+"""Дешёвый предварительный отбор эталонов перед полным DTW.
+
+Для каждого эталона при сборке банка считается «конспект» фиксированного
+размера – шаблон из ``SUMMARY_LEN`` кадров (средние по равным сегментам
+записи). Оценка идёт в два этапа:
+
+1. DTW между конспектами теста и эталонов (16×16 вместо T×T) ранжирует
+   эталоны;
+2. полный DTW считается только для ``k`` лучших.
+
+Ранжирование по конспектам – эвристика, а не нижняя граница полного DTW:
+при ``k`` > 0 минимум может оказаться хуже точного, и решение по порогу
+``DTW_LIMIT`` иногда меняется. Поэтому в сервисе предотбор выключен
+(``SCORING_PREFILTER_K=0``); включать его стоит только после того, как
+проверка ниже покажет нулевой дрейф на рабочем банке.
+
+``k=None`` – точный режим (полный перебор, как раньше). Проверка точности
+на собранном банке::
+
+    python -m audio.prefilter --k 4 8 16
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numba
+import numpy as np
+
+from audio.dtw import _dtw_core, band_window, dtw_batch
+
+SUMMARY_LEN = 16
+
+
+def summarize(feat: np.ndarray, length: int = SUMMARY_LEN) -> np.ndarray:
+    """(39, T) → (length, 39): средние по ``length`` равным сегментам.
+
+    Для T < length сегменты перекрываются (кадры повторяются).
+    """
+    frames = np.asarray(feat, dtype=np.float64).T
+    T = frames.shape[0]
+    cs = np.vstack([np.zeros((1, frames.shape[1])), np.cumsum(frames, axis=0)])
+    i = np.arange(length)
+    lo = (i * T) // length
+    hi = np.maximum(lo + 1, ((i + 1) * T) // length)
+    return ((cs[hi] - cs[lo]) / (hi - lo)[:, None]).astype(np.float32)
+
+
+def summarize_all(refs: Sequence[np.ndarray], length: int = SUMMARY_LEN) -> np.ndarray:
+    """Конспекты всех эталонов слова, форма (n, length, 39)."""
+    if not refs:
+        return np.zeros((0, length, 0), np.float32)
+    return np.stack([summarize(r, length) for r in refs])
+
+
+@numba.njit(cache=True)
+def _summary_costs(Q, R, lo, hi):
+    out = np.empty(R.shape[0])
+    for n in range(R.shape[0]):
+        out[n], _ = _dtw_core(R[n], Q, lo, hi, np.inf)
+    return out
+
+
+def rank(test_feat: np.ndarray, summaries: np.ndarray) -> np.ndarray:
+    """Индексы эталонов по возрастанию DTW-стоимости конспектов."""
+    Q = summarize(test_feat, summaries.shape[1])
+    L = summaries.shape[1]
+    lo, hi = band_window(L, L)
+    costs = _summary_costs(Q, np.ascontiguousarray(summaries, dtype=np.float32), lo, hi)
+    return np.argsort(costs, kind="stable")
+
+
+def top_k(test_feat: np.ndarray, refs: Sequence[np.ndarray],
+          summaries: Optional[np.ndarray], k: Optional[int]) -> list[np.ndarray]:
+    """Эталоны-кандидаты для полного DTW (все, если ``k`` не задан или их мало)."""
+    if not k or len(refs) <= k:
+        return list(refs)
+    if summaries is None or len(summaries) != len(refs):
+        summaries = summarize_all(refs)
+    return [refs[i] for i in rank(test_feat, summaries)[:k]]
+
+
+# ── accuracy check ───────────────────────────────────────────────────────────
+def check(bank_path: Optional[Path], ks: Sequence[int], strategy: str = "min") -> None:
+    """Leave-one-out по банку: каждый эталон – «тест» против остальных
+    эталонов своего слова; сравнивает top-k с полным перебором."""
+    from audio.feature_bank import get_feature_bank
+
+    bank = get_feature_bank(bank_path)
+    bank.load()
+    words = [w for w in bank.words() if len(bank.get(w)) > 2]
+    if not words:
+        raise SystemExit("No words with more than two references in the bank")
+
+    warm = bank.get(words[0])
+    top_k(np.asarray(warm[0]), warm, None, 1)     # JIT не должен попасть в замеры
+    dtw_batch(np.asarray(warm[0]), warm)
+
+    results = {k: {"same": 0, "drift": [], "seconds": 0.0} for k in ks}
+    exact_seconds, cases = 0.0, 0
+    for word in words:
+        refs, sums = bank.get(word), bank.summaries(word)
+        for i in range(len(refs)):
+            test = np.asarray(refs[i])
+            others = refs[:i] + refs[i + 1:]
+            rest = np.delete(sums, i, axis=0)
+
+            t0 = time.perf_counter()
+            exact, _ = dtw_batch(test, others, strategy=strategy)
+            exact_seconds += time.perf_counter() - t0
+            cases += 1
+
+            for k in ks:
+                t0 = time.perf_counter()
+                approx, _ = dtw_batch(test, top_k(test, others, rest, k), strategy=strategy)
+                res = results[k]
+                res["seconds"] += time.perf_counter() - t0
+                res["same"] += approx == exact
+                res["drift"].append(approx - exact)
+
+    print(f"{len(words)} words, {cases} held-out recordings, exact: "
+          f"{exact_seconds / cases * 1000:.2f} ms/check")
+    for k, res in results.items():
+        drift = np.abs(res["drift"])
+        print(f"  k={k:<3d} same score {res['same'] / cases:6.1%}  "
+              f"drift mean {drift.mean():.3f} max {drift.max():.3f}  "
+              f"{res['seconds'] / cases * 1000:.2f} ms/check")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check top-k reference pre-filtering against brute force")
+    parser.add_argument("--bank", type=Path, default=None, help="bank directory or .npz (default: built bank)")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--strategy", default="min", choices=["min", "mean"])
+    args = parser.parse_args(argv)
+    check(args.bank, args.k, args.strategy)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,163 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import hashlib
+import os
 import shutil
+import time
 from collections import defaultdict
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
+
 import numpy as np
-from sqlalchemy import select
 
 from audio.analyze import analyse
+from audio.bank_format import BANK_DIR, write_bank
+from audio.db_sync import sync_audio_counts
+from audio.quantize import DTYPES
+from audio.templates import MAX_TEMPLATES, build_templates
 from db import init_db
-from bot.models import Word
 
 # ── Configuration ────────────────────────────────────────────────────────────
 BASE_DIR  = Path(__file__).resolve().parent
 MODEL_DIR = BASE_DIR / "model"         # исходные подпапки с OGG
 TARGET_DIR = BASE_DIR / "models"       # куда копируем переименованные файлы
 TARGET_DIR.mkdir(exist_ok=True)
-FEATURES_FILE = BASE_DIR / "features.npz"
+FEATURES_DIR = BANK_DIR               # шардированный банк (audio/bank_format.py)
+CACHE_DIR = BASE_DIR / ".feature_cache"  # признаки по хэшу содержимого файла
+CACHE_VERSION = "1"                    # поднять, если меняется analyse()
 
-async def process_subdir(subdir: Path) -> tuple[dict[str, int], list[tuple[str, np.ndarray]]]:
-    """Асинхронно обрабатывает одну подпапку *subdir*.
 
-    * копирует файлы в TARGET_DIR,
-    * извлекает признаки (в to_thread),
-    * возвращает (word → count) и список (имя_файла, features).
-    """
-    counts: dict[str, int] = defaultdict(int)
-    features: list[tuple[str, np.ndarray]] = []
+@dataclass
+class Extracted:
+    src: Path
+    digest: str
+    features: Optional[np.ndarray]
+    cached: bool
+    error: Optional[str] = None
 
-    for f in sorted(subdir.glob("*.ogg")):
-        name = f.stem.lower()
-        word = ''.join([i for i in name if i.isalpha()])
-        if word == "":
-            continue
-        idx = counts[word]
-        new_name = f"{word}_{idx}.ogg"
-        dest = TARGET_DIR / new_name
 
-        # I/O операции в отдельном потоке, чтобы не блокировать event‑loop
-        await asyncio.to_thread(shutil.copy2, f, dest)
+def word_of(f: Path) -> str:
+    name = f.stem.lower()
+    return ''.join([i for i in name if i.isalpha()])
+
 
-        # Извлечение MFCC также в другом потоке
-        feat = await asyncio.to_thread(analyse, dest)
-        features.append((new_name, feat))
+def file_digest(path: Path) -> str:
+    h = hashlib.sha1(CACHE_VERSION.encode())
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-        counts[word] += 1
 
-    return counts, features
+def extract(src: Path, use_cache: bool = True) -> Extracted:
+    """Признаки одного файла (выполняется в процессе пула).
 
-async def main() -> None:
-    subdirs = [d for d in sorted(MODEL_DIR.iterdir()) if d.is_dir()]
-    if not subdirs:
-        print("No sub‑directories found in", MODEL_DIR)
+    Результат кэшируется в CACHE_DIR по хэшу содержимого, поэтому повторный
+    прогон пересчитывает только новые или изменённые записи.
+    """
+    digest = file_digest(src)
+    cache_file = CACHE_DIR / f"{digest}.npy"
+    if use_cache and cache_file.exists():
+        return Extracted(src, digest, np.load(cache_file), cached=True)
+    try:
+        feat = analyse(src).astype(np.float32)
+    except Exception as e:  # битый файл или тишина – пропускаем, но сообщаем
+        return Extracted(src, digest, None, cached=False, error=f"{type(e).__name__}: {e}")
+    if use_cache:
+        CACHE_DIR.mkdir(exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp.npy")
+        np.save(tmp, feat)
+        os.replace(tmp, cache_file)
+    return Extracted(src, digest, feat, cached=False)
+
+
+def copy_if_changed(src: Path, dest: Path) -> bool:
+    try:
+        s, d = src.stat(), dest.stat()
+        if s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns:
+            return False
+    except FileNotFoundError:
+        pass
+    shutil.copy2(src, dest)
+    return True
+
+
+def collect_sources() -> list[Path]:
+    """Все OGG из подпапок MODEL_DIR в детерминированном порядке."""
+    files = []
+    for subdir in sorted(d for d in MODEL_DIR.iterdir() if d.is_dir()):
+        files += [f for f in sorted(subdir.glob("*.ogg")) if word_of(f)]
+    return files
+
+
+async def extract_all(files: list[Path], workers: int, use_cache: bool) -> list[Extracted]:
+    """Раскидывает файлы по пулу процессов и печатает прогресс."""
+    loop = asyncio.get_running_loop()
+    results: list[Extracted] = []
+    started = time.perf_counter()
+    step = max(1, len(files) // 20)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [loop.run_in_executor(pool, extract, f, use_cache) for f in files]
+        for i, fut in enumerate(asyncio.as_completed(futures), 1):
+            results.append(await fut)
+            if i % step == 0 or i == len(files):
+                elapsed = time.perf_counter() - started
+                print(f"  {i}/{len(files)} files, {i / elapsed:.1f} files/s")
+    return results
+
+
+async def main(workers: Optional[int] = None, use_cache: bool = True,
+               templates: int = MAX_TEMPLATES, dtype: str = "float32") -> None:
+    files = collect_sources()
+    if not files:
+        print("No .ogg files found in", MODEL_DIR)
         return
 
-    # Параллельно обрабатываем все папки (по умолч. неограниченное число задач).
-    results = await asyncio.gather(*(process_subdir(sd) for sd in subdirs))
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    print(f"Extracting features from {len(files)} files on {workers} processes …")
+    results = await extract_all(files, workers, use_cache)
+    by_src = {r.src: r for r in results}
 
-    # ───── агрегируем результаты ──────────────────────────────────
+    # ───── индексы <word>_<idx> назначаем глобально и детерминированно ──
     total_counts: dict[str, int] = defaultdict(int)
     all_features: dict[str, np.ndarray] = {}
+    copies: list[tuple[Path, Path]] = []
+    failed = [r for r in results if r.features is None]
+
+    for f in files:
+        res = by_src[f]
+        if res.features is None:
+            continue
+        word = word_of(f)
+        new_name = f"{word}_{total_counts[word]}.ogg"
+        total_counts[word] += 1
+        all_features[new_name] = res.features
+        copies.append((f, TARGET_DIR / new_name))
 
-    for counts, feats in results:
-        for w, c in counts.items():
-            total_counts[w] += c
-        for name, feat in feats:
-            all_features[name] = feat.astype(np.float32)
+    copied = sum(await asyncio.gather(*(asyncio.to_thread(copy_if_changed, s, d) for s, d in copies)))
 
     # ───── сохраняем feature‑банк ─────────────────────────────────
-    np.savez_compressed(FEATURES_FILE, **all_features)
-    print("Saved", FEATURES_FILE.relative_to(BASE_DIR))
+    builder = partial(build_templates, max_templates=templates) if templates else None
+    stats = await asyncio.to_thread(write_bank, FEATURES_DIR, all_features,
+                                    builder, f"dba{templates}", dtype)
+    print("Saved", FEATURES_DIR.relative_to(BASE_DIR), stats)
+
+    elapsed = time.perf_counter() - started
+    cached = sum(r.cached for r in results)
+    print(
+        f"Done in {elapsed:.1f}s ({len(files) / elapsed:.1f} files/s): "
+        f"{len(results) - cached - len(failed)} extracted, {cached} from cache, "
+        f"{len(failed)} failed, {copied} copied, {len(total_counts)} words"
+    )
+    for r in failed:
+        print("  FAILED", r.src.relative_to(MODEL_DIR), "–", r.error)
 
     # ───── обновляем БД ───────────────────────────────────────────
     await init_db()
@@ -77,16 +165,18 @@ async def main() -> None:
     from db import async_session_maker
 
     async with async_session_maker() as session:
-        for word, cnt in total_counts.items():
-            stmt = select(Word).where(Word.english_word == word)
-            obj = await session.scalar(stmt)
-            if obj:
-                obj.audio = cnt
-            else:
-                obj = Word(english_word=word, audio=cnt)
-                session.add(obj)
-        await session.commit()
-    print("Database updated:", len(total_counts), "words")
+        # полный пересчёт – количество записей задаём точно, а не максимумом
+        result = await sync_audio_counts(session, total_counts, keep_max=False)
+    print("Database updated:", len(total_counts), "words –", result)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the reference feature bank from audio/model")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the per-file feature cache")
+    parser.add_argument("--templates", type=int, default=MAX_TEMPLATES,
+                        help="averaged (DBA) templates per word, 0 = don't build")
+    parser.add_argument("--dtype", choices=DTYPES, default="float32",
+                        help="storage type of reference features (see audio/quantize.py)")
+    args = parser.parse_args()
+    asyncio.run(main(args.workers, use_cache=not args.no_cache, templates=args.templates,
+                     dtype=args.dtype))
@@ -0,0 +1,113 @@
+"""Компактное хранение эталонных признаков в банке.
+
+* ``float32`` – как раньше;
+* ``float16`` – вдвое меньше, точность ~3 значащих цифры;
+* ``int8`` – вчетверо меньше: для каждого слова и каждого из 39
+  коэффициентов хранятся ``scale``/``offset``, ``x ≈ q * scale + offset``.
+
+Шард слова хранится в выбранном типе, DTW по-прежнему считается во float32:
+эталон распаковывается целиком при выдаче из банка (это 39×T, т.е.
+несколько килобайт на запрос).
+
+Отчёт об экономии памяти и сдвиге оценок по всему банку (собранному во
+float32)::
+
+    python -m audio.quantize [audio/features]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+SUFFIX = {"float32": "", "float16": ".f16", "int8": ".i8"}
+
+
+def quantize(frames: np.ndarray, dtype: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Кадры слова (ΣT, dim) float32 → (данные в *dtype*, ``[scale, offset]`` или None)."""
+    if dtype == "float32":
+        return np.ascontiguousarray(frames, dtype=np.float32), None
+    if dtype == "float16":
+        return frames.astype(np.float16), None
+    if dtype != "int8":
+        raise ValueError(f"Unknown bank dtype `{dtype}`")
+
+    if not len(frames):
+        return frames.astype(np.int8), np.stack([np.ones(frames.shape[1]), np.zeros(frames.shape[1])]
+                                                ).astype(np.float32)
+    lo = frames.min(axis=0).astype(np.float64)
+    hi = frames.max(axis=0).astype(np.float64)
+    scale = np.where(hi > lo, (hi - lo) / 254.0, 1.0)
+    offset = lo + 127.0 * scale
+    q = np.clip(np.rint((frames - offset) / scale), -127, 127).astype(np.int8)
+    return q, np.stack([scale, offset]).astype(np.float32)
+
+
+def dequantize(block: np.ndarray, quant: Optional[np.ndarray] = None) -> np.ndarray:
+    """Обратное к ``quantize`` для куска кадров (T, dim) → float32."""
+    if block.dtype == np.float32:
+        return block
+    if block.dtype == np.int8:
+        return block.astype(np.float32) * quant[0] + quant[1]
+    return block.astype(np.float32)
+
+
+# ── report ───────────────────────────────────────────────────────────────────
+def report(bank_path: Union[str, Path], dtypes: Sequence[str] = DTYPES[1:]) -> None:
+    """Память и сдвиг DTW-оценок для каждого *dtype* относительно float32.
+
+    Каждый эталон по очереди играет роль записи учащегося (float32) против
+    остальных эталонов слова, сохранённых в проверяемом типе.
+    """
+    from audio.dtw import dtw_batch
+    from audio.feature_bank import get_feature_bank
+
+    bank = get_feature_bank(bank_path)
+    bank.load()
+    words = bank.words()
+    if not words:
+        raise SystemExit(f"Bank {bank_path} is empty")
+
+    sizes = {d: 0 for d in ("float32", *dtypes)}
+    drift: dict[str, list[float]] = {d: [] for d in dtypes}
+    for word in words:
+        refs = [np.ascontiguousarray(np.asarray(r, dtype=np.float32).T) for r in bank.get(word)]
+        block = np.concatenate(refs, axis=0)
+        sizes["float32"] += block.nbytes
+        stored = {}
+        for d in dtypes:
+            q, quant = quantize(block, d)
+            sizes[d] += q.nbytes + (quant.nbytes if quant is not None else 0)
+            restored = dequantize(q, quant)
+            bounds = np.cumsum([0] + [len(r) for r in refs])
+            stored[d] = [restored[a:b].T for a, b in zip(bounds[:-1], bounds[1:])]
+
+        if len(refs) < 2:
+            continue
+        for i, test in enumerate(refs):
+            exact, _ = dtw_batch(test.T, [r.T for j, r in enumerate(refs) if j != i])
+            for d in dtypes:
+                approx, _ = dtw_batch(test.T, [r for j, r in enumerate(stored[d]) if j != i])
+                drift[d].append(approx - exact)
+
+    print(f"{len(words)} words")
+    print(f"  float32  {sizes['float32'] / 2**20:8.2f} MiB")
+    for d in dtypes:
+        err = np.abs(drift[d]) if drift[d] else np.zeros(1)
+        print(f"  {d:8s} {sizes[d] / 2**20:8.2f} MiB  (−{1 - sizes[d] / sizes['float32']:.0%})  "
+              f"score drift mean {err.mean():.4f} p99 {np.percentile(err, 99):.4f} max {err.max():.4f}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Memory / score drift of quantised bank storage")
+    parser.add_argument("bank", type=Path, nargs="?", default=None, help="bank directory or .npz")
+    parser.add_argument("--dtype", nargs="+", default=list(DTYPES[1:]), choices=DTYPES[1:])
+    args = parser.parse_args(argv)
+    report(args.bank, args.dtype)
+
+
+if __name__ == "__main__":
+    main()
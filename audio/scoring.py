@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from audio.analyze import analyse, analyse_bytes
+from audio.decode import get_decoder_pool
+from audio.dtw import dtw_batch, dtw_cost
+from audio.feature_bank import get_feature_bank
+from audio.prefilter import top_k
+
+
+def evaluate_pronunciation(
+    word: str,
+    webm_path: Union[str, Path],
+    features_npz_path: Optional[Union[str, Path]] = None,
+    strategy: str = "min",  # "min" | "mean" | "template"
+    band: Optional[str] = None,  # None | "sakoe" | "itakura"
+    k: Optional[int] = None,     # полный DTW только для k лучших по предотбору
+) -> float:
+    """Возвращает score.
+
+    * ``word`` – английское слово (регистр игнорируется)
+    * ``webm_path`` – путь к записи учащегося (.webm, .wav, …)
+    * ``features_npz_path`` – банк эталонов (каталог audio/bank_format или
+      старый ``features.npz`` с ключами ``<word>_<idx>.ogg``); по умолчанию
+      берётся собранный банк
+    * ``strategy="template"`` – сравнение только с усреднёнными шаблонами
+      слова (audio/templates.py): один-три DTW вместо N; если банк собран
+      без шаблонов – обычный ``"min"`` по всем эталонам
+    * ``k`` – сколько эталонов оставить после предотбора (audio/prefilter.py);
+      ``None`` – точный перебор всех эталонов. Только для ``strategy="min"``:
+      среднее по части эталонов смещено, ``"mean"`` всегда считается по всем
+    """
+    return score_features(word, analyse(webm_path), features_npz_path, strategy, band, k)
+
+
+def score_features(
+    word: str,
+    test_feat: np.ndarray,
+    features_npz_path: Optional[Union[str, Path]] = None,
+    strategy: str = "min",
+    band: Optional[str] = None,
+    k: Optional[int] = None,
+) -> float:
+    """DTW-score уже извлечённых признаков против эталонов слова."""
+    word = word.lower()
+    bank = get_feature_bank(features_npz_path)
+    ref_features = []
+    if strategy == "template":
+        ref_features = [t for t, _ in bank.templates(word)]
+        strategy = "min"          # лучший из шаблонов; предотбор не нужен
+        if ref_features:
+            k = None
+        else:
+            logging.warning("No templates for `%s` in %s, scoring against all references", word, bank.path)
+    if not ref_features:
+        ref_features = bank.get(word)
+    if not ref_features:
+        raise KeyError(f"В банке {bank.path} нет эталонов для слова `{word}`.")
+
+    if k and strategy == "min" and len(ref_features) > k:
+        ref_features = top_k(test_feat, ref_features, bank.summaries(word), k)
+    score, _ = dtw_batch(test_feat, ref_features, strategy=strategy, band=band)
+    return float(score)
+
+
+# ── process-pool entry points ────────────────────────────────────────────────
+def init_worker(bank_path: Optional[Union[str, Path]] = None) -> None:
+    """Инициализатор воркера пула: заранее поднимает банк, ffmpeg и JIT DTW."""
+    get_feature_bank(bank_path).load()
+    get_decoder_pool().warm()
+    dtw_cost(np.zeros((39, 2), np.float32), np.zeros((39, 2), np.float32))
+    top_k(np.zeros((39, 2), np.float32), [np.zeros((39, 2), np.float32)] * 2, None, 1)
+
+
+def score_recording(word: str, data: bytes, strategy: str = "min", k: Optional[int] = None) -> float:
+    """Оценивает запись, переданную байтами (выполняется в процессе пула)."""
+    return score_features(word, analyse_bytes(data), strategy=strategy, k=k)
+
+
+def score_strategies(word: str, data: bytes, strategies: Sequence[str],
+                     k: Optional[int] = None) -> dict[str, float]:
+    """Score записи для нескольких стратегий (признаки извлекаются один раз).
+
+    Ошибки первой стратегии пробрасываются, остальные («теневые», только для
+    логов) при ошибке просто пропускаются.
+    """
+    feat = analyse_bytes(data)
+    scores = {strategies[0]: score_features(word, feat, strategy=strategies[0], k=k)}
+    for strategy in strategies[1:]:
+        try:
+            scores[strategy] = score_features(word, feat, strategy=strategy, k=k)
+        except Exception as e:
+            logging.warning("Shadow strategy %s failed for `%s`: %s", strategy, word, e)
+    return scores
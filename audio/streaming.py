@@ -0,0 +1,314 @@
+"""Потоковая оценка произношения: запись обрабатывается по мере поступления.
+
+Цепочка та же, что ``analyse_bytes`` → ``score_features``, только по кускам::
+
+    PCM16 → VAD по 30-мс фреймам → речевые сэмплы → STFT/mel, как только
+    набралось окно → MFCC(+Δ, ΔΔ) → онлайн-DTW против эталонов слова
+
+К концу речи почти все mel-кадры уже посчитаны. ``finish()`` досчитывает
+хвост, переводит mel в MFCC по всей записи (как librosa: общий максимум в
+``power_to_db``, дельты с ``mode="nearest"``) и запускает ``dtw_batch``, так
+что итоговые признаки совпадают с ``extract_mfcc`` на тех же речевых
+сэмплах, и пороги ``DTW_LIMIT`` сохраняют смысл.
+
+Обрезка тишины (``librosa.effects.trim``) и сетка VAD-фреймов тоже
+совпадают с пакетным путём – см. ``StreamingScorer``.
+"""
+from __future__ import annotations
+
+import asyncio
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import librosa
+import numpy as np
+import scipy.fft
+import webrtcvad
+
+from audio.analyze import MIN_SPEECH_MS, NoSpeech, convert_to_pcm16, vad_flags
+from audio.decode import SR, MAX_SECONDS, AudioTooLong, DecodeError
+from audio.dtw import OnlineDTW, dtw_batch
+from audio.prefilter import top_k
+
+N_FFT = 2048                # параметры librosa.feature.mfcc по умолчанию
+HOP = 512
+N_MFCC = 13
+FRAME_MS = 30               # как в analyse_signal
+DELTA_CONTEXT = 4           # librosa.feature.delta(width=9): ±4 кадра
+TOP_DB = 80.0
+AMIN = 1e-10
+
+
+@lru_cache(maxsize=4)
+def _mel_basis(sr: int) -> np.ndarray:
+    return librosa.filters.mel(sr=sr, n_fft=N_FFT)
+
+
+class IncrementalMFCC:
+    """MFCC(+Δ, ΔΔ) сигнала, который дописывается кусками.
+
+    * mel-спектр кадра считается, как только его окно целиком получено
+      (``center=True`` с нулевым паддингом, как в librosa);
+    * ``push`` возвращает предварительные признаки кадров, для которых уже
+      известен правый контекст дельт (dB-порог по текущему максимуму);
+    * ``finish`` возвращает точные признаки всей записи.
+    """
+
+    def __init__(self, sr: int = SR, max_seconds: float = MAX_SECONDS):
+        self.sr = sr
+        self._mel_basis = _mel_basis(sr)
+        self._pad = N_FFT // 2
+        self._buf = np.zeros(self._pad + int(max_seconds * sr) + self._pad, np.float32)
+        self._max_frames = 1 + int(max_seconds * sr) // HOP
+        self._mel = np.zeros((self._mel_basis.shape[0], self._max_frames), np.float32)
+        self._mfcc = np.zeros((N_MFCC, self._max_frames), np.float32)
+        self.samples = 0
+        self.frames = 0          # посчитанные mel-кадры
+        self._emitted = 0        # кадры, отданные в push
+        self._db_max = -np.inf
+
+    def _mel_frames(self, start: int, stop: int) -> None:
+        if stop <= start:
+            return
+        seg = self._buf[start * HOP:(stop - 1) * HOP + N_FFT]
+        power = np.abs(librosa.stft(seg, n_fft=N_FFT, hop_length=HOP, center=False)) ** 2
+        mel = np.einsum("...ft,mf->...mt", power, self._mel_basis, optimize=True)
+        self._mel[:, start:stop] = mel
+
+        # предварительные MFCC: dB-порог по максимуму, известному на сейчас
+        db = 10.0 * np.log10(np.maximum(AMIN, mel))
+        self._db_max = max(self._db_max, float(db.max()))
+        db = np.maximum(db, self._db_max - TOP_DB)
+        self._mfcc[:, start:stop] = scipy.fft.dct(db, axis=0, type=2, norm="ortho")[:N_MFCC]
+        self.frames = stop
+
+    def push(self, y: np.ndarray) -> np.ndarray:
+        """Дописывает сэмплы; возвращает новые предварительные кадры (39, k)."""
+        n = len(y)
+        if self.samples + n > len(self._buf) - 2 * self._pad:
+            raise AudioTooLong(f"Audio is longer than {MAX_SECONDS:g} s")
+        self._buf[self._pad + self.samples:self._pad + self.samples + n] = y
+        self.samples += n
+
+        known = self._pad + self.samples
+        ready = (known - N_FFT) // HOP + 1 if known >= N_FFT else 0
+        self._mel_frames(self.frames, ready)
+
+        stable = self.frames - DELTA_CONTEXT
+        if stable <= self._emitted:
+            return np.zeros((3 * N_MFCC, 0), np.float32)
+        lo = max(0, self._emitted - DELTA_CONTEXT)
+        block = self._mfcc[:, lo:self.frames]
+        sl = slice(self._emitted - lo, stable - lo)
+        out = np.vstack([
+            block[:, sl],
+            librosa.feature.delta(block, mode="nearest")[:, sl],
+            librosa.feature.delta(block, order=2, mode="nearest")[:, sl],
+        ])
+        self._emitted = stable
+        return out
+
+    def truncate(self, samples: int) -> None:
+        """Откатывает сигнал до первых *samples* сэмплов (кадры на хвосте пересчитаются)."""
+        if samples >= self.samples:
+            return
+        self._buf[self._pad + samples:self._pad + self.samples] = 0
+        self.samples = samples
+        known = self._pad + samples
+        valid = (known - N_FFT) // HOP + 1 if known >= N_FFT else 0
+        self.frames = min(self.frames, valid)
+        self._emitted = min(self._emitted, max(0, self.frames - DELTA_CONTEXT))
+
+    def finish(self) -> np.ndarray:
+        """Точные признаки всей записи (как ``extract_mfcc``), форма (39, T)."""
+        total = 1 + self.samples // HOP
+        self._mel_frames(self.frames, total)   # правый паддинг – нули буфера
+        mel = self._mel[:, :total]
+        mfcc = scipy.fft.dct(librosa.power_to_db(mel), axis=-2, type=2, norm="ortho")[:N_MFCC]
+        delta = librosa.feature.delta(mfcc, mode="nearest")
+        delta2 = librosa.feature.delta(mfcc, order=2, mode="nearest")
+        return np.vstack([mfcc, delta, delta2])
+
+
+class StreamingScorer:
+    """Trim + VAD + MFCC + DTW для одной записи, поступающей кусками PCM16.
+
+    ``librosa.effects.trim`` в пакетном пути задаёт и границы, и сетку
+    30-мс VAD-фреймов, а зависит от максимума всей записи. Поэтому начало
+    обрезки оценивается по энергии уже пришедших кадров; если оно сдвигается
+    (запись стала громче), обработка перезапускается с нового начала –
+    обычно это случается в первые сотни миллисекунд речи. В ``finish``
+    границы считаются точно, лишние фреймы после конца отбрасываются.
+    """
+
+    def __init__(self, refs: Sequence[np.ndarray], sr: int = SR,
+                 max_seconds: float = MAX_SECONDS, vad_mode: int = 3, top_db: float = 20,
+                 summaries: Optional[np.ndarray] = None):
+        if not refs:
+            raise ValueError("No reference features given")
+        self.refs = refs
+        self.summaries = summaries
+        self.sr = sr
+        self.top_db = top_db
+        self.max_seconds = max_seconds
+        self.max_samples = int(max_seconds * sr)
+        self.vad_mode = vad_mode
+        self._frame = sr * FRAME_MS // 1000
+        # сигнал как после decode_bytes, с нулями по краям (center=True в trim)
+        self._padded = np.zeros(N_FFT // 2 + self.max_samples + N_FFT // 2, np.float32)
+        self._y = self._padded[N_FFT // 2:N_FFT // 2 + self.max_samples]
+        self._rms = np.zeros(1 + self.max_samples // HOP, np.float32)
+        self._rms_frames = 0
+        self._odd = b""              # нечётный байт между кусками
+        self.samples = 0
+        self._reset(0)
+
+    def _reset(self, start: int) -> None:
+        self._start = start
+        self._pos = start            # первый сэмпл, ещё не прошедший VAD
+        self._vad = webrtcvad.Vad(self.vad_mode)   # у VAD есть состояние между фреймами
+        self._flags: list[np.ndarray] = []
+        self.speech_frames = 0
+        self.mfcc = IncrementalMFCC(self.sr, self.max_seconds)
+        self.dtw = OnlineDTW(self.refs)
+
+    @property
+    def speech_ms(self) -> int:
+        return self.speech_frames * FRAME_MS
+
+    def _trim_bounds(self, final: bool = False) -> tuple[int, int]:
+        """``librosa.effects.trim(y, top_db)[1]`` по RMS-кадрам, посчитанным
+        по мере поступления; без ``final`` – только по полным окнам."""
+        n = self.samples
+        known = N_FFT // 2 + n
+        total = 1 + n // HOP if final else (known - N_FFT) // HOP + 1 if known >= N_FFT else 0
+        if total > self._rms_frames:
+            seg = self._padded[self._rms_frames * HOP:(total - 1) * HOP + N_FFT]
+            self._rms[self._rms_frames:total] = librosa.feature.rms(
+                y=seg, frame_length=N_FFT, hop_length=HOP, center=False)[0]
+            self._rms_frames = total
+        if not total:
+            return 0, 0
+        db = librosa.amplitude_to_db(self._rms[:total], ref=np.max, top_db=None)
+        loud = np.flatnonzero(db > -self.top_db)
+        if not loud.size:
+            return 0, 0
+        return int(loud[0]) * HOP, min(n, int(loud[-1] + 1) * HOP)
+
+    def _process(self, stop: int) -> None:
+        """VAD + MFCC для целых фреймов между ``_pos`` и ``stop``."""
+        n_frames = (stop - self._pos) // self._frame
+        if n_frames <= 0:
+            return
+        end = self._pos + n_frames * self._frame
+        frames = convert_to_pcm16(self._y[self._pos:end]).reshape(n_frames, self._frame)
+        self._pos = end
+
+        flags = vad_flags(self._vad, frames, self.sr)
+        self._flags.append(flags)
+        self.speech_frames += int(np.count_nonzero(flags))
+        speech = frames[flags].reshape(-1).astype(np.float32) / 32767.
+        new = self.mfcc.push(speech)
+        if new.shape[1]:
+            self.dtw.extend(new)
+
+    def feed_bytes(self, data: bytes) -> None:
+        """Кусок s16le (границы кусков могут резать сэмпл пополам)."""
+        data = self._odd + data
+        cut = len(data) - len(data) % 2
+        self._odd = data[cut:]
+        self.feed(np.frombuffer(data[:cut], dtype=np.int16))
+
+    def feed(self, pcm: np.ndarray) -> None:
+        n, k = self.samples, len(pcm)
+        if n + k > self.max_samples:
+            raise AudioTooLong(f"Audio is longer than {self.max_seconds:g} s")
+        self._y[n:n + k] = pcm.astype(np.float32) / 32768.0   # как DecoderPool / libsndfile
+        self.samples += k
+
+        start, _ = self._trim_bounds()
+        if start != self._start:
+            self._reset(start)
+        self._process(self.samples)
+
+    def partial(self, strategy: str = "min") -> float:
+        """Текущая оценка по уже пришедшей речи (для подсказок в UI)."""
+        return self.dtw.cost(strategy)
+
+    def finish(self, strategy: str = "min", band: Optional[str] = None,
+               k: Optional[int] = None) -> float:
+        """Итоговый score – тот же, что вернул бы ``score_recording``."""
+        start, end = self._trim_bounds(final=True)
+        if (end - start) * 1000 < MIN_SPEECH_MS * self.sr:
+            raise NoSpeech("Recording is empty or too short")
+        if start != self._start:
+            self._reset(start)
+        self._process(end)
+
+        # пакетный путь видит только фреймы внутри [start, end)
+        keep = (end - start) // self._frame
+        flags = np.concatenate(self._flags) if self._flags else np.zeros(0, bool)
+        speech = int(np.count_nonzero(flags[:keep]))
+        if speech * FRAME_MS < MIN_SPEECH_MS:
+            raise NoSpeech("No speech detected")
+        self.mfcc.truncate(speech * self._frame)
+
+        feat = self.mfcc.finish()
+        # среднее по части эталонов смещено – предотбор только для "min"
+        refs = top_k(feat, self.refs, self.summaries, k if strategy == "min" else None)
+        score, _ = dtw_batch(feat, refs, strategy=strategy, band=band)
+        return float(score)
+
+
+class StreamDecoder:
+    """ffmpeg, декодирующий контейнер (webm/ogg из браузера) по мере записи.
+
+    Вход пишется в stdin, PCM16 16 кГц читается из stdout *параллельно*
+    (иначе ffmpeg заблокируется на полном pipe).
+    """
+
+    def __init__(self, sr: int = SR, max_seconds: float = MAX_SECONDS):
+        self.sr = sr
+        self.max_seconds = max_seconds
+        self.proc: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self) -> None:
+        try:
+            self.proc = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-v", "error", "-i", "pipe:0",
+                "-t", f"{self.max_seconds + 1 / self.sr:.6f}",
+                "-ar", str(self.sr), "-ac", "1", "-f", "s16le", "pipe:1",
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise DecodeError("ffmpeg is not available")
+
+    async def write(self, chunk: bytes) -> None:
+        try:
+            self.proc.stdin.write(chunk)
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise DecodeError("ffmpeg closed its input")
+
+    async def read(self, n: int = 1 << 15) -> bytes:
+        """Следующий кусок PCM; ``b""`` – конец потока."""
+        return await self.proc.stdout.read(n)
+
+    async def end_input(self) -> None:
+        if not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+
+    async def wait(self) -> None:
+        err = await self.proc.stderr.read()
+        if await self.proc.wait() != 0:
+            raise DecodeError(err.decode(errors="replace").strip() or "ffmpeg failed")
+
+    def kill(self) -> None:
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.kill()
+
+
+def warm() -> None:
+    """Компилирует (или поднимает из кэша) numba-ядро онлайн-DTW."""
+    OnlineDTW([np.zeros((3 * N_MFCC, 2), np.float32)]).extend(np.zeros((3 * N_MFCC, 2), np.float32))
@@ -0,0 +1,121 @@
+"""Усреднённые эталоны слова (DTW Barycenter Averaging).
+
+Вместо сравнения записи учащегося с каждым диктором слово представлено
+одним или несколькими «консенсусными» шаблонами:
+
+* эталоны слова делятся на группы (k-medoids по DTW-стоимости), если их
+  достаточно много, иначе группа одна;
+* шаблон группы – DBA: начиная с медоиды, каждый кадр шаблона заменяется
+  средним всех кадров эталонов, выровненных на него DTW-путём;
+* для шаблона сохраняется разброс – DTW-стоимости членов группы до него.
+
+Шаблоны считаются при сборке банка (audio/preprocess_audio.py) и лежат
+рядом с сырыми признаками; ``strategy="template"`` в scoring сравнивает
+запись только с ними.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import librosa
+import numpy as np
+
+from audio.dtw import dtw_cost
+
+MAX_TEMPLATES = 3       # шаблонов на слово
+MIN_GROUP = 4           # меньше эталонов в группе – не делим дальше
+DBA_ITERATIONS = 10
+
+
+def _pairwise(refs: Sequence[np.ndarray]) -> np.ndarray:
+    n = len(refs)
+    cost = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            cost[i, j] = cost[j, i] = dtw_cost(refs[i], refs[j])
+    return cost
+
+
+def _k_medoids(cost: np.ndarray, k: int, iterations: int = 20) -> np.ndarray:
+    """Номер группы для каждого эталона (детерминированно)."""
+    # старт: самый «центральный», затем каждый раз самый далёкий от выбранных
+    medoids = [int(np.argmin(cost.sum(axis=1)))]
+    while len(medoids) < k:
+        nearest = cost[:, medoids].min(axis=1)
+        nearest[medoids] = -1.0            # медоида не выбирается дважды
+        far = int(np.argmax(nearest))
+        if nearest[far] <= 0:
+            break                          # остались только дубли выбранных – групп меньше
+        medoids.append(far)
+    k = len(medoids)
+    for _ in range(iterations):
+        labels = _assign(cost, medoids)
+        new = []
+        for g in range(k):
+            members = np.flatnonzero(labels == g)
+            within = cost[np.ix_(members, members)].sum(axis=1)
+            new.append(int(members[np.argmin(within)]))
+        if new == medoids:
+            break
+        medoids = new
+    return _assign(cost, medoids)
+
+
+def _assign(cost: np.ndarray, medoids: list[int]) -> np.ndarray:
+    """Ближайшая медоида; сама медоида – всегда в своей группе (ни одна не пуста)."""
+    labels = np.argmin(cost[:, medoids], axis=1)
+    labels[medoids] = np.arange(len(medoids))
+    return labels
+
+
+def dba(refs: Sequence[np.ndarray], init: np.ndarray, iterations: int = DBA_ITERATIONS) -> np.ndarray:
+    """DTW Barycenter Averaging: шаблон (39, T) той же длины, что ``init``."""
+    template = np.asarray(init, dtype=np.float64)
+    for _ in range(iterations):
+        acc = np.zeros_like(template)
+        count = np.zeros(template.shape[1])
+        for ref in refs:
+            ref = np.asarray(ref, dtype=np.float64)
+            _, wp = librosa.sequence.dtw(X=template, Y=ref, metric="euclidean")
+            np.add.at(acc.T, wp[:, 0], ref.T[wp[:, 1]])
+            np.add.at(count, wp[:, 0], 1)
+        updated = acc / np.maximum(count, 1)
+        if np.allclose(updated, template, atol=1e-4):
+            template = updated
+            break
+        template = updated
+    return template.astype(np.float32)
+
+
+def build_templates(refs: Sequence[np.ndarray], max_templates: int = MAX_TEMPLATES,
+                    min_group: int = MIN_GROUP) -> list[tuple[np.ndarray, dict]]:
+    """Шаблоны слова: ``[(признаки (39, T), {"members", "spread"}), …]``.
+
+    ``spread`` – DTW-стоимости членов группы до шаблона (mean/std/max):
+    по нему видно, насколько дикторы группы согласны между собой.
+    """
+    refs = [np.asarray(r, dtype=np.float32) for r in refs if r.shape[1]]
+    if not refs:
+        return []
+    cost = _pairwise(refs)
+    k = max(1, min(max_templates, len(refs) // min_group))
+    labels = _k_medoids(cost, k) if k > 1 else np.zeros(len(refs), int)
+
+    out = []
+    for g in np.unique(labels):
+        members = np.flatnonzero(labels == g)
+        group = [refs[i] for i in members]
+        medoid = group[int(np.argmin(cost[np.ix_(members, members)].sum(axis=1)))]
+        template = dba(group, medoid) if len(group) > 1 else medoid
+        dist = np.array([dtw_cost(template, r) for r in group])
+        out.append((template, {
+            "members": len(group),
+            "spread": {
+                "mean": round(float(dist.mean()), 3),
+                "std": round(float(dist.std()), 3),
+                "max": round(float(dist.max()), 3),
+            },
+        }))
+    # самая большая группа – первой
+    out.sort(key=lambda t: -t[1]["members"])
+    return out
@@ -5,14 +5,13 @@ import re
 import sys
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict
 
 project_root = Path(__file__).parent.parent.resolve()
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from bot.models import Word
-from sqlalchemy import select
+from audio.db_sync import sync_audio_counts
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -60,18 +59,11 @@ async def update_db_with_counts() -> None:
     counts = await asyncio.to_thread(_collect_audio_counts)
 
     async with AsyncSessionLocal() as session:
-        for word, max_count in counts.items():
-            stmt = select(Word).where(Word.english_word == word)
-            obj: Optional[Word] = await session.scalar(stmt)
-            if obj:
-                if obj.audio is None or obj.audio < max_count:
-                    print(f"  UPDATE word={word!r}: audio {obj.audio} → {max_count}")
-                    obj.audio = max_count
-            else:
-                print(f"  INSERT word={word!r}, audio={max_count}")
-                session.add(Word(english_word=word, audio=max_count))
-
-        await session.commit()
+        # audio = GREATEST(audio, max_count): счётчик только растёт
+        result = await sync_audio_counts(session, counts)
+    print(f"Database updated: {len(counts)} words – {result}")
+
+    await engine.dispose()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from db import lifespan_context
+from audio.feature_bank import get_feature_bank, publish_npz
+from audio.streaming import warm as warm_streaming
+from backend.scoring import get_scoring_executor
+
+from backend.routers import authentication, collections, learning, tasks, pronunciation, spaced_repeat, metrics
+
 
-from backend.routers import authentication, collections, learning, tasks, pronunciation, spaced_repeat
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with lifespan_context(app):
+        # a legacy features.npz becomes a shared mmap'ed bank before anyone loads it,
+        # then warm it up so the first request doesn't pay for it
+        await asyncio.to_thread(publish_npz)
+        await asyncio.to_thread(get_feature_bank().load)
+        await asyncio.to_thread(warm_streaming)
+        executor = get_scoring_executor()
+        executor.start()
+        try:
+            yield
+        finally:
+            executor.shutdown()
 
 
 def build_api() -> FastAPI:
     app = FastAPI(
         title="StarEng API",
-        lifespan=lifespan_context,
+        lifespan=lifespan,
         root_path="/stareng/api",
         docs_url="/docs",
         openapi_url="/openapi.json"
@@ -22,6 +44,7 @@ def build_api() -> FastAPI:
     app.include_router(tasks.router)
     app.include_router(pronunciation.router)
     app.include_router(spaced_repeat.router)
+    app.include_router(metrics.router)
 
     # CORS – adjust domains in prod
     app.add_middleware(
@@ -30,5 +53,6 @@ def build_api() -> FastAPI:
         allow_credentials=True,
         allow_methods=["GET", "POST", "OPTIONS"],
         allow_headers=["Content-Type", "Authorization"],
+        expose_headers=["X-Tasks-Degraded"],
     )
     return app
@@ -52,9 +52,19 @@ async def get_current_user(
 ) -> User:
     if cred is None:
         raise HTTPException(status_code=401, detail="Missing token")
+    return await user_from_token(cred.credentials, db)
 
+def require_metrics_token(cred: HTTPAuthorizationCredentials = Depends(bearer)) -> None:
+    """Internal endpoints answer only to ``METRICS_TOKEN``; without one they don't exist."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if cred is None or not hmac.compare_digest(cred.credentials.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def user_from_token(token: str, db: AsyncSession) -> User:
+    """Resolve a JWT to its user (also used by websockets, which pass it as ?token=)."""
     try:
-        payload = jwt.decode(cred.credentials, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
         tg_id = int(payload["sub"])
     except JWTError as e:
         print("JWT decode error:", e)
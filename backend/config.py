@@ -1,3 +1,6 @@
+import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 from bot.config import BOT_TOKEN, SECRET_KEY
@@ -8,4 +11,32 @@ class Settings(BaseSettings):
     JWT_ALG: str = "HS256"
     JWT_EXP_MIN: int = 60 * 24  # 24h
 
+    # pronunciation scoring pool
+    SCORING_WORKERS: int = os.cpu_count() or 1
+    SCORING_QUEUE: int = 16          # jobs waiting on top of the busy workers
+    # seconds the request waits for a job (then 504). The job itself isn't interrupted:
+    # it keeps its worker and admission slot until it finishes.
+    SCORING_TIMEOUT: float = 15.0
+    SCORING_RETRY_AFTER: int = 2     # seconds, sent with 503
+    MAX_AUDIO_BYTES: int = 1024 * 1024  # uploads above this are rejected before decoding
+    # full DTW only for the k best references (approximate, "min" only); 0 = exact.
+    # Enable only once `python -m audio.prefilter` shows no drift on the production bank.
+    SCORING_PREFILTER_K: int = 0
+    SCORING_BATCH_MAX: int = 8         # recordings per POST /pronunciation/batch
+    # chosen by the server: DTW_LIMIT is calibrated for "min" over the raw speakers
+    SCORING_STRATEGY: Literal["min", "mean", "template"] = "min"
+    # also computed for uploads and only logged, to compare before switching (JSON list in env)
+    SCORING_SHADOW_STRATEGIES: list[Literal["min", "mean", "template"]] = []
+    RESULT_CACHE_SIZE: int = 4096      # scores kept for retried uploads; 0 = off
+
+    # /tasks: seconds (from the start of the request) LLM-backed context tasks may take
+    TASKS_LLM_BUDGET: float = 2.0
+
+    # live pronunciation streams (websocket)
+    STREAM_MAX_SESSIONS: int = 32
+    STREAM_IDLE_TIMEOUT: float = 10.0  # seconds without a message before giving up
+
+    # bearer token for GET /metrics (pool, cache, LLM and user-activity counters); empty = 404
+    METRICS_TOKEN: str = ""
+
 settings = Settings(BOT_TOKEN = BOT_TOKEN, JWT_SECRET = SECRET_KEY)
\ No newline at end of file
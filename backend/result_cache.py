@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+
+from backend.config import settings
+
+
+class ResultCache:
+    """
+    Bounded LRU of pronunciation scores with in-flight deduplication.
+
+    Clients on flaky networks retry uploads, so the same blob is often scored twice.
+    A repeated key returns the cached ``dtw`` right away; concurrent identical keys
+    await the one computation already running. Failures are shared by the callers
+    that were waiting, but never cached.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, float] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0            # waited for an identical in-flight computation
+
+    @staticmethod
+    def key(data: bytes, word: str, strategy: str, k: Optional[int], bank_version: str) -> tuple:
+        return hashlib.sha256(data).hexdigest(), word.lower(), strategy, k or 0, bank_version
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[float]]) -> float:
+        if self.max_entries <= 0:
+            return await compute()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            task = self._inflight.get(key)
+            if task is not None:
+                self.joined += 1
+            else:
+                self.misses += 1
+                task = self._inflight[key] = asyncio.ensure_future(compute())
+                task.add_done_callback(lambda t: self._store(key, t))
+        # a caller that disconnects must not cancel the others' computation
+        return await asyncio.shield(task)
+
+    def _store(self, key: Hashable, task: asyncio.Task) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if task.cancelled() or task.exception() is not None:
+                return
+            self._entries[key] = task.result()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # ── metrics ──────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        lookups = self.hits + self.joined + self.misses
+        return {
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "joined": self.joined,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.joined) / lookups, 3) if lookups else None,
+        }
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        _cache = ResultCache(max_entries=settings.RESULT_CACHE_SIZE)
+    return _cache
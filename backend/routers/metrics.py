@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from backend.auth import require_metrics_token
+from backend.result_cache import get_result_cache
+from backend.routers.tasks import get_tasks_stats
+from backend.scoring import get_scoring_executor
+from backend.streaming import get_stream_manager
+from bot.llm_cache import get_llm_cache
+from bot.llm_gateway import get_llm_gateway
+from bot.singleflight import get_singleflight
+
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/", response_model=dict)
+async def get_metrics():
+    """Internal counters for sizing the API (queue depth, latency, …)."""
+    return {
+        "scoring": get_scoring_executor().stats(),
+        "result_cache": get_result_cache().stats(),
+        "streaming": get_stream_manager().stats(),
+        "tasks": get_tasks_stats().stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "llm_singleflight": get_singleflight().stats(),
+        "llm_gateway": get_llm_gateway().stats(),
+    }
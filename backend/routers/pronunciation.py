@@ -1,44 +1,25 @@
-from typing import Union
-from pathlib import Path
-import tempfile
+import asyncio
+import logging
+from typing import List, Optional
 
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, WebSocket, \
+    WebSocketDisconnect, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.config import settings
 from backend.deps import get_session
+from backend.result_cache import ResultCache, get_result_cache
+from backend.scoring import ScoringBusy, get_scoring_executor
+from backend.streaming import StreamError, get_stream_manager
 from bot.models import User, CEFR               # CEFR enum is already declared by you
-from backend.auth import get_current_user           # same dependency we used earlier
+from backend.auth import get_current_user, user_from_token  # same dependency we used earlier
+from db import async_session_maker
 
-import numpy as np
-
-from audio.analyze import compute_dtw, analyse
-
-FEATURES_NPZ = Path(__file__).resolve().parent.parent.parent/"audio"/"features.npz"
-
-def evaluate_pronunciation(
-    word: str,
-    webm_path: Union[str, Path],
-    features_npz_path: Union[str, Path] = FEATURES_NPZ,
-    strategy: str = "min",  # "min" | "mean"
-) -> float:
-    """Возвращает score.
-
-    * ``word`` – английское слово (регистр игнорируется)
-    * ``webm_path`` – путь к записи учащегося (.webm, .wav, …)
-    * ``features.npz`` должен содержать ключи ``<word>_<idx>.ogg``
-    """
-    word = word.lower()
-    data = np.load(features_npz_path, allow_pickle=True)
-    ref_keys = [k for k in data.files if k.split('_')[0] == word]
-    if not ref_keys:
-        raise KeyError(f"В архиве {features_npz_path} нет эталонов для слова `{word}`.")
-    ref_features = [data[k] for k in ref_keys]
-
-    test_feat = analyse(webm_path)
-    costs = [compute_dtw(ref, test_feat)[0] for ref in ref_features]
-    score = float(np.mean(costs) if strategy == "mean" else np.min(costs))
-    return score
+from audio.analyze import NoSpeech
+from audio.decode import AudioTooLong, DecodeError
+from audio.feature_bank import get_feature_bank
+from audio.scoring import score_strategies
 
 # ─────────────────────────────────────────────────────────────
 class PronResp(BaseModel):
@@ -46,6 +27,19 @@ class PronResp(BaseModel):
     points: int
     dtw: float
 
+
+class PronBatchItem(BaseModel):
+    task_id: Optional[str] = None
+    word: str
+    status: int = 200                  # HTTP status the single endpoint would have answered
+    result: Optional[PronResp] = None
+    detail: Optional[str] = None
+    retry_after: Optional[int] = None  # seconds, for a 503 (the single endpoint's Retry-After)
+
+
+class PronBatchResp(BaseModel):
+    items: List[PronBatchItem]
+
 # DTW thresholds table
 DTW_LIMIT = {
     CEFR.A: 130,
@@ -53,9 +47,107 @@ DTW_LIMIT = {
     CEFR.C: 110,
 }
 
+async def read_upload(audio: UploadFile) -> bytes:
+    """Read the upload into memory, rejecting anything above MAX_AUDIO_BYTES."""
+    limit = settings.MAX_AUDIO_BYTES
+    if audio.size is not None and audio.size > limit:
+        raise HTTPException(status_code=413, detail="Audio file is too large")
+    try:
+        data = await audio.read(limit + 1)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Audio read failed: {e}")
+    if len(data) > limit:
+        raise HTTPException(status_code=413, detail="Audio file is too large")
+    return data
+
+async def score_upload(word: str, data: bytes) -> float:
+    """Score one recording in the scoring pool, mapping failures to HTTP errors.
+
+    The strategy is ``SCORING_STRATEGY``; ``SCORING_SHADOW_STRATEGIES`` are scored
+    alongside and only logged. Retried uploads of the same blob are answered from
+    the result cache.
+    """
+    strategy, k = settings.SCORING_STRATEGY, settings.SCORING_PREFILTER_K
+    strategies = (strategy, *(s for s in settings.SCORING_SHADOW_STRATEGIES if s != strategy))
+    # what's published on disk: .version could reload (decompress) the bank on the event loop
+    key = ResultCache.key(data, word, strategy, k, get_feature_bank().published_version)
+
+    async def compute() -> float:
+        scores = await get_scoring_executor().submit(score_strategies, word, data, strategies, k)
+        if len(strategies) > 1:
+            logging.info(f"Pronunciation `{word}`: " + ", ".join(
+                f"{name}={score:.2f}" + (" (served)" if name == strategy else "")
+                for name, score in scores.items()))
+        return scores[strategy]
+
+    try:
+        return await get_result_cache().get_or_compute(key, compute)
+    except ScoringBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Pronunciation scoring is busy, try again later",
+            headers={"Retry-After": str(settings.SCORING_RETRY_AFTER)},
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Pronunciation scoring timed out")
+    except AudioTooLong as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Audio decode failed: {e}")
+    except NoSpeech as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No reference recordings for `{word}`")
+
+
+def award(dtw_cost: float, user: User) -> PronResp:
+    limit = DTW_LIMIT[user.cefr or CEFR.A]     # default to A if null
+    points = 3 if dtw_cost < limit else 0
+    return PronResp(ok=points > 0, points=points, dtw=dtw_cost)
+
 # ─────────────────────────────────────────────────────────────
 router = APIRouter(prefix="/pronunciation", tags=["pronunciation"])
 
+# registered before "/{task_id}", which would otherwise swallow "/batch"
+@router.post("/batch", response_model=PronBatchResp)
+async def check_pronunciation_batch(
+    word: List[str] = Form(..., description="one per recording, in the same order as `audio`"),
+    audio: List[UploadFile] = File(..., description="webm recordings"),
+    task_id: Optional[List[str]] = Form(None, description="optional, echoed back per item"),
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """
+    Score several recordings (e.g. both pronunciation cards of a session) in one request.
+
+    Items are scored concurrently in the scoring pool with the same thresholds as
+    ``POST /pronunciation/{task_id}``; a failing item gets its own ``status``/``detail``
+    (and ``retry_after`` when the pool is busy) instead of failing the batch.
+    """
+    if len(word) != len(audio) or (task_id is not None and len(task_id) != len(audio)):
+        raise HTTPException(status_code=422, detail="`word`, `audio` (and `task_id`) must have equal length")
+    if len(audio) > settings.SCORING_BATCH_MAX:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {settings.SCORING_BATCH_MAX} recordings per batch")
+
+    async def one(i: int) -> PronBatchItem:
+        item = PronBatchItem(task_id=task_id[i] if task_id else None, word=word[i])
+        try:
+            data = await read_upload(audio[i])
+            item.result = award(await score_upload(word[i], data), user)
+        except HTTPException as e:
+            item.status, item.detail = e.status_code, e.detail
+            if e.headers and "Retry-After" in e.headers:
+                item.retry_after = int(e.headers["Retry-After"])
+        except Exception:
+            # e.g. a broken pool or a librosa error – fails this item, not the batch
+            logging.exception(f"Pronunciation batch item `{word[i]}` failed")
+            item.status, item.detail = 500, "Pronunciation scoring failed"
+        return item
+
+    return PronBatchResp(items=await asyncio.gather(*(one(i) for i in range(len(audio)))))
+
+
 @router.post("/{task_id}", response_model=PronResp)
 async def check_pronunciation(
     task_id: str,
@@ -71,22 +163,44 @@ async def check_pronunciation(
     * B-level  – cost < 120 → 3 %; otherwise 0
     * C-level  – cost < 110 → 3 %; otherwise 0
     """
-    # 1) save the uploaded webm to a temp file
-    try:
-        tmp = Path(tempfile.mkstemp(suffix=".webm")[1])
-        tmp.write_bytes(await audio.read())
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Audio save failed: {e}")
+    # 1) read the uploaded webm (refuse oversize uploads before decoding)
+    data = await read_upload(audio)
 
-    # 2) run evaluator
-    try:
-        dtw_cost: float = evaluate_pronunciation(word, tmp)
-    finally:
-        tmp.unlink(missing_ok=True)  # cleanup
+    # 2) run evaluator in the scoring pool (keeps the event loop free)
+    dtw_cost: float = await score_upload(word, data)
 
     # 3) decide points by CEFR level
-    cefr_level: CEFR = user.cefr or CEFR.A     # default to A if null
-    limit = DTW_LIMIT[cefr_level]
+    return award(dtw_cost, user)
 
-    points = 3 if dtw_cost < limit else 0
-    return PronResp(ok=points > 0, points=points, dtw=dtw_cost)
+
+@router.websocket("/{task_id}/stream")
+async def stream_pronunciation(
+    websocket: WebSocket,
+    task_id: str,
+    token: str = Query(..., description="JWT (browsers can't set headers on websockets)"),
+):
+    """
+    Same scoring and thresholds as ``POST /pronunciation/{task_id}``, but the audio is
+    decoded, VAD-filtered, turned into MFCCs and aligned while the user is still speaking,
+    so the result is ready right after ``{"type": "end"}``. Protocol: backend/streaming.py.
+    """
+    # short-lived session: don't hold a DB connection for the whole recording
+    async with async_session_maker() as db:
+        try:
+            user = await user_from_token(token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await websocket.accept()
+    try:
+        dtw_cost = await get_stream_manager().run(websocket)
+    except WebSocketDisconnect:
+        return
+    except StreamError as e:
+        await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+        await websocket.close(code=e.close_code)
+        return
+
+    result = award(dtw_cost, user)
+    await websocket.send_json({"type": "result", **result.model_dump()})
+    await websocket.close()
@@ -1,36 +1,101 @@
-import asyncio
 import math, random
+import threading
+import time
+from collections import deque
 from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from backend.config import settings
 from backend.deps import get_session
 from bot.models import AddedWord, Word, Translation, User
 from backend.auth import get_current_user         # JWT → User
 from backend.models import TranslationTask, TasksResponse, SpellingTask, PronunciationTask, Pair, MatchingTask, \
     ContextTask
 
-from bot.ai import Sentences, get_context_sentences
+from bot.context_sentences import context_sentences_for
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 CEFR_ATTEMPTS = {"A": 3, "B": 2, "C": 1, None: 3}
 
-async def build_task(idx: int, row, cefr) -> ContextTask:
+
+class TaskAssemblyStats:
+    """Counters for /tasks: how often the LLM budget forced degraded context tasks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=1024)
+        self.requests = 0
+        self.degraded_requests = 0
+        self.context_tasks = 0
+        self.fallback = 0          # replaced by the translation's stored example
+        self.dropped = 0           # no sentence at all
+
+    def record(self, seconds: float, context_tasks: int, fallback: int, dropped: int) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.degraded_requests += bool(fallback or dropped)
+            self.context_tasks += context_tasks
+            self.fallback += fallback
+            self.dropped += dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 2)
+
+        return {
+            "llm_budget_s": settings.TASKS_LLM_BUDGET,
+            "requests": self.requests,
+            "degraded_requests": self.degraded_requests,
+            "context_tasks": self.context_tasks,
+            "fallback": self.fallback,
+            "dropped": self.dropped,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+_stats = TaskAssemblyStats()
+
+
+def get_tasks_stats() -> TaskAssemblyStats:
+    return _stats
+
+
+async def build_context_tasks(db: AsyncSession, start: int, rows, cefr,
+                              timeout: Optional[float] = None) -> tuple[list[ContextTask], int, int]:
     """
-    Wrap one OpenAI request.  Runs concurrently thanks to create_task().
+    Context sentences are normally pre-generated when the word is added
+    (bot/context_sentences.py); rows still missing one share a single OpenAI request,
+    awaited for at most *timeout* seconds. Rows left without a sentence fall back to the
+    translation's stored example, or are dropped if it has none.
+    Returns ``(tasks, fallback, dropped)``.
     """
-    res: Sentences = await get_context_sentences(
-        row.word.english_word,
-        row.translation.translation,
-        cefr,
+    sentences = await context_sentences_for(
+        db, [(row.translation_id, row.word.english_word, row.translation.translation) for row in rows],
+        cefr, timeout,
     )
-    if cefr is None:
-        cefr = "A"
-    return ContextTask(id=f"t{idx}", en=res.en, ru=res.ru, level=cefr)
+    level = cefr or "A"
+    tasks, fallback, dropped = [], 0, 0
+    for idx, (row, res) in enumerate(zip(rows, sentences), start=start):
+        if res is not None:
+            tasks.append(ContextTask(id=f"t{idx}", en=res.en, ru=res.ru, level=level))
+        elif row.translation.example_en and row.translation.example_ru:
+            tasks.append(ContextTask(id=f"t{idx}", en=row.translation.example_en,
+                                     ru=row.translation.example_ru, level=level))
+            fallback += 1
+        else:
+            dropped += 1
+    return tasks, fallback, dropped
 
 def mix_variants(correct: str, distractors: list[str]) -> tuple[list[str], int]:
     need = 4
@@ -45,6 +110,7 @@ def mix_variants(correct: str, distractors: list[str]) -> tuple[list[str], int]:
 @router.get("/{collection_id}", response_model=TasksResponse)
 async def translation_tasks(
     collection_id: int,
+    response: Response,
     word_ids: List[int] = Query(..., alias="word_ids"),
     db: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
@@ -52,7 +118,12 @@ async def translation_tasks(
     """
     Build translation tasks for the *exact* word-ids requested by the client.
     Example:  /translation?word_ids=12&word_ids=15
+
+    LLM-backed context tasks get at most ``TASKS_LLM_BUDGET`` seconds from the start of the
+    request; the number of context tasks that had to be degraded is returned in the
+    ``X-Tasks-Degraded`` header.
     """
+    started = time.monotonic()
     if not word_ids:
         raise HTTPException(400, detail="word_ids is required")
 
@@ -199,15 +270,12 @@ async def translation_tasks(
         t_id += 1
     random.shuffle(pr_tasks)
 
-    created_tasks = [
-        asyncio.create_task(build_task(idx, row, user.cefr))
-        for idx, row in enumerate(rows, start=t_id)
-    ]
+    budget = max(0.0, settings.TASKS_LLM_BUDGET - (time.monotonic() - started))
+    cx_tasks, fallback, dropped = await build_context_tasks(db, t_id, rows, user.cefr, budget)
+    response.headers["X-Tasks-Degraded"] = str(fallback + dropped)
 
     t_id += len(rows)
 
-    cx_tasks: list[ContextTask] = await asyncio.gather(*created_tasks)
-
     random.shuffle(cx_tasks)
 
     tasks = tr_tasks + sp_tasks + pr_tasks + cx_tasks
@@ -223,4 +291,5 @@ async def translation_tasks(
     tasks.append(MatchingTask(id=f"t{t_id}", pairs=pairs, mistakes=mistakes))
     t_id += 1
 
+    _stats.record(time.monotonic() - started, len(rows), fallback, dropped)
     return tasks
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from backend.config import settings
+from audio.scoring import init_worker
+
+
+class ScoringBusy(Exception):
+    """Raised when the scoring queue is saturated."""
+
+
+class ScoringExecutor:
+    """
+    Process pool for CPU-heavy pronunciation scoring with a bounded queue.
+
+    At most ``workers + queue_size`` jobs are admitted at once; anything above
+    that is rejected immediately with :class:`ScoringBusy`.
+
+    Live streams keep their state in the API process, so they can't run in the
+    pool: a stream holds one of the same slots for its whole duration
+    (:meth:`reserve`) and its CPU steps run in threads, at most ``workers`` at a
+    time (:meth:`run_inline`).
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.timeout = timeout
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._streams = 0
+        self._inline = asyncio.Semaphore(self.workers)
+        self._latencies: deque[float] = deque(maxlen=1024)
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+            logging.info("Scoring pool started: %d workers, capacity %d", self.workers, self.capacity)
+        return self._pool
+
+    def start(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            return self._ensure_pool()
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        # a worker died – rebuild the pool so the next request succeeds. Every job of the
+        # broken pool lands here; only the first one may replace it, or a late waiter would
+        # shut down (and cancel the jobs of) the pool an earlier one just rebuilt.
+        with self._pool_lock:
+            if self._pool is not broken:
+                return
+            logging.error("Scoring pool is broken, restarting")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._ensure_pool()
+
+    # ── submission ───────────────────────────────────────────────────────
+    def _release(self, started: float):
+        def done(_fut) -> None:
+            with self._lock:
+                self._pending -= 1
+                self._latencies.append(time.perf_counter() - started)
+        return done
+
+    async def submit(self, fn, *args):
+        """Run ``fn(*args)`` in the pool; raise ScoringBusy / asyncio.TimeoutError."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise ScoringBusy()
+            self._pending += 1
+            self.submitted += 1
+
+        started = time.perf_counter()
+        pool = self.start()
+        try:
+            cf = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                self._pending -= 1
+            self.failed += 1
+            self._restart(pool)
+            raise
+        # the slot is freed only when the job really leaves the pool
+        cf.add_done_callback(self._release(started))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(cf), self.timeout)
+        except asyncio.TimeoutError:
+            # only the caller stops waiting: a job already running can't be interrupted and
+            # keeps its worker – and its admission slot, see _release – until it finishes
+            self.timed_out += 1
+            raise
+        except BrokenProcessPool:
+            self.failed += 1
+            self._restart(pool)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    @contextmanager
+    def reserve(self):
+        """Hold one admission slot (e.g. for a live stream); raise ScoringBusy if full."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise ScoringBusy()
+            self._pending += 1
+            self._streams += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._streams -= 1
+
+    async def run_inline(self, fn, *args):
+        """``fn(*args)`` in a thread, with no more than ``workers`` of them running at once."""
+        async with self._inline:
+            return await asyncio.to_thread(fn, *args)
+
+    # ── metrics ──────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            streams = self._streams
+            pending = self._pending - streams
+            lat = sorted(self._latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 2)
+
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": min(pending, self.workers),
+            "queue_depth": max(0, pending - self.workers),
+            "streams": streams,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+_executor: Optional[ScoringExecutor] = None
+
+
+def get_scoring_executor() -> ScoringExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ScoringExecutor(
+            workers=settings.SCORING_WORKERS,
+            queue_size=settings.SCORING_QUEUE,
+            timeout=settings.SCORING_TIMEOUT,
+        )
+    return _executor
@@ -0,0 +1,251 @@
+"""
+Live pronunciation scoring over a WebSocket.
+
+Protocol (``/pronunciation/{task_id}/stream?token=<jwt>``):
+
+1. client → ``{"word": "cat", "format": "webm"}`` –
+   ``"pcm16"`` means raw s16le, 16 kHz mono (e.g. from an AudioWorklet),
+   anything else goes through ffmpeg as it arrives; the scoring strategy is
+   the server's ``SCORING_STRATEGY``, as for uploads;
+2. client → binary audio chunks while the user is still speaking;
+   server → ``{"type": "partial", "speech_ms": …, "dtw": …}`` as speech comes in;
+3. client → ``{"type": "end"}`` once recording stops;
+4. server → ``{"type": "result", "ok": …, "points": …, "dtw": …}`` and closes.
+
+Errors are sent as ``{"type": "error", "status": <http status>, "detail": …}``
+followed by a close frame.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from backend.config import settings
+from audio.analyze import NoSpeech
+from audio.decode import AudioTooLong, DecodeError
+from audio.feature_bank import get_feature_bank
+from backend.scoring import ScoringBusy, ScoringExecutor, get_scoring_executor
+from audio.streaming import StreamDecoder, StreamingScorer
+
+
+class StreamError(Exception):
+    """A stream failed; ``status`` mirrors the HTTP code of the POST endpoint."""
+
+    def __init__(self, status_code: int, detail: str,
+                 close_code: int = status.WS_1008_POLICY_VIOLATION):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.close_code = close_code
+
+
+class StreamSession:
+    """One recording: feeds chunks to a StreamingScorer as they arrive."""
+
+    def __init__(self, websocket: WebSocket, scorer: StreamingScorer,
+                 decoder: Optional[StreamDecoder], idle_timeout: float, max_bytes: int,
+                 executor: ScoringExecutor, strategy: str = "min"):
+        self.websocket = websocket
+        self.executor = executor
+        self.scorer = scorer
+        self.decoder = decoder
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self.strategy = strategy
+        self.received = 0
+        self.finish_seconds = 0.0
+
+    async def _feed(self, data: bytes) -> None:
+        before = self.scorer.dtw.frames
+        await self.executor.run_inline(self.scorer.feed_bytes, data)
+        if self.scorer.dtw.frames != before:
+            await self.websocket.send_json({
+                "type": "partial",
+                "speech_ms": self.scorer.speech_ms,
+                "dtw": round(self.scorer.partial(self.strategy), 2),
+            })
+
+    async def _pump(self) -> None:
+        # ffmpeg stdout → scorer, concurrently with writes to its stdin
+        while chunk := await self.decoder.read():
+            await self._feed(chunk)
+
+    async def run(self) -> float:
+        """Consume the stream up to ``{"type": "end"}``; return the DTW score."""
+        reader: Optional[asyncio.Task] = None
+        if self.decoder is not None:
+            await self.decoder.start()
+            reader = asyncio.create_task(self._pump())
+        try:
+            while True:
+                try:
+                    msg = await asyncio.wait_for(self.websocket.receive(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    raise StreamError(408, "No audio received in time")
+                if msg["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(msg.get("code", status.WS_1000_NORMAL_CLOSURE))
+                if reader is not None and reader.done():
+                    reader.result()       # re-raise decode / length errors early
+
+                if msg.get("bytes") is not None:
+                    data = msg["bytes"]
+                    self.received += len(data)
+                    if self.received > self.max_bytes:
+                        raise StreamError(413, "Audio stream is too large")
+                    if self.decoder is not None:
+                        await self.decoder.write(data)
+                    else:
+                        await self._feed(data)
+                elif _parse(msg.get("text")).get("type") == "end":
+                    break
+
+            finished = time.perf_counter()
+            if self.decoder is not None:
+                await self.decoder.end_input()
+                await reader
+                await self.decoder.wait()
+            score = await self.executor.run_inline(
+                self.scorer.finish, self.strategy, None, settings.SCORING_PREFILTER_K)
+            self.finish_seconds = time.perf_counter() - finished
+            return score
+        finally:
+            if reader is not None and not reader.done():
+                reader.cancel()
+            if self.decoder is not None:
+                self.decoder.kill()
+
+
+def _parse(text: Optional[str]) -> dict:
+    try:
+        msg = json.loads(text or "")
+    except json.JSONDecodeError:
+        raise StreamError(400, "Expected a JSON control message")
+    if not isinstance(msg, dict):
+        raise StreamError(400, "Expected a JSON control message")
+    return msg
+
+
+class StreamManager:
+    """Admission control and counters for live scoring sessions.
+
+    Besides ``max_sessions``, every session takes a slot of the scoring executor,
+    so uploads and streams together stay within its capacity.
+    """
+
+    def __init__(self, max_sessions: int, idle_timeout: float, max_bytes: int,
+                 executor: Optional[ScoringExecutor] = None):
+        self.executor = executor or get_scoring_executor()
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=1024)
+
+        self.active = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def _open(self, websocket: WebSocket) -> StreamSession:
+        try:
+            start = await asyncio.wait_for(websocket.receive_text(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise StreamError(408, "Start message not received in time")
+        start = _parse(start)
+        word = str(start.get("word") or "").lower()
+        if not word:
+            raise StreamError(400, "`word` is required")
+
+        strategy = settings.SCORING_STRATEGY
+        bank = get_feature_bank()
+        refs = []
+        if strategy == "template":
+            refs = [t for t, _ in await self.executor.run_inline(bank.templates, word)]
+            summaries, strategy = None, "min"
+        if not refs:                     # also a bank without templates, like score_features
+            refs = await self.executor.run_inline(bank.get, word)
+            summaries = await self.executor.run_inline(bank.summaries, word)
+        if not refs:
+            raise StreamError(404, f"No reference recordings for `{word}`")
+        scorer = StreamingScorer(refs, summaries=summaries)
+        decoder = None if start.get("format") == "pcm16" else StreamDecoder()
+        return StreamSession(websocket, scorer, decoder, self.idle_timeout, self.max_bytes,
+                             self.executor, strategy)
+
+    async def run(self, websocket: WebSocket) -> float:
+        """Serve one accepted websocket; return the DTW score or raise StreamError."""
+        with self._lock:
+            if self.active >= self.max_sessions:
+                self.rejected += 1
+                raise StreamError(503, "Pronunciation scoring is busy, try again later",
+                                  status.WS_1013_TRY_AGAIN_LATER)
+            self.active += 1
+            self.started += 1
+        try:
+            with self.executor.reserve():
+                session = await self._open(websocket)
+                score = await session.run()
+        except ScoringBusy:
+            with self._lock:
+                self.rejected += 1
+            raise StreamError(503, "Pronunciation scoring is busy, try again later",
+                              status.WS_1013_TRY_AGAIN_LATER)
+        except AudioTooLong as e:
+            self.failed += 1
+            raise StreamError(413, str(e))
+        except DecodeError as e:
+            self.failed += 1
+            raise StreamError(400, f"Audio decode failed: {e}")
+        except NoSpeech as e:
+            self.failed += 1
+            raise StreamError(422, str(e))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+        with self._lock:
+            self.completed += 1
+            self._latencies.append(session.finish_seconds)
+        return score
+
+    # ── metrics ──────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 2)
+
+        return {
+            "max_sessions": self.max_sessions,
+            "active": self.active,
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            # time from the client's "end" to the result being ready
+            "finish_latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+_manager: Optional[StreamManager] = None
+
+
+def get_stream_manager() -> StreamManager:
+    global _manager
+    if _manager is None:
+        _manager = StreamManager(
+            max_sessions=settings.STREAM_MAX_SESSIONS,
+            idle_timeout=settings.STREAM_IDLE_TIMEOUT,
+            max_bytes=settings.MAX_AUDIO_BYTES,
+        )
+    return _manager
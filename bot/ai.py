@@ -1,10 +1,17 @@
+import asyncio
 import logging
-from typing import Optional
+from typing import Optional, Sequence
 
-from openai import AsyncOpenAI
 from pydantic import BaseModel
 
-client = AsyncOpenAI()
+from bot.llm_cache import get_llm_cache, llm_cached
+from bot.llm_gateway import get_llm_gateway
+from bot.singleflight import get_singleflight
+
+gateway = get_llm_gateway()          # concurrency caps, rate limits, circuit breaker
+client = gateway.client
+
+MODEL = "gpt-4.1-nano"
 
 class TranslationModel(BaseModel):
     transcription: str
@@ -16,10 +23,12 @@ class Translations(BaseModel):
     word: str
     translations: list[TranslationModel]
 
+@llm_cached(Translations, MODEL)
 async def get_gpt_translations(english_word: str) -> Optional[Translations]:
     try:
-        response = await client.responses.parse(
-            model="gpt-4.1-nano",
+        response = await gateway.parse(
+            "get_gpt_translations",
+            model=MODEL,
             input=[
                 {
                     "role": "system",
@@ -58,10 +67,12 @@ class Options(BaseModel):
     wrong8: str
     wrong9: str
 
+@llm_cached(Options, MODEL)
 async def get_translation_options(english_word: str, level: str) -> Optional[Options]:
     try:
-        response = await client.responses.parse(
-            model="gpt-4.1-nano",
+        response = await gateway.parse(
+            "get_translation_options",
+            model=MODEL,
             input=[
                 {
                     "role": "system",
@@ -86,17 +97,16 @@ class Sentences(BaseModel):
     en: str
     ru: str
 
+LEVEL_NAMES = {"A": "Beginner", "B": "Intermediate", "C": "Advanced"}
+
+@llm_cached(Sentences, MODEL)
 async def get_context_sentences(english_word: str, russian_word: str, level: str) -> Optional[Sentences]:
-    if level == 'A':
-        level = "Beginner"
-    elif level == 'B':
-        level = "Intermediate"
-    elif level == 'C':
-        level = "Advanced"
+    level = LEVEL_NAMES.get(level, level)
 
     try:
-        response = await client.responses.parse(
-            model="gpt-4.1-nano",
+        response = await gateway.parse(
+            "get_context_sentences",
+            model=MODEL,
             input=[
                 {
                     "role": "system",
@@ -115,4 +125,82 @@ async def get_context_sentences(english_word: str, russian_word: str, level: str
         return response.output_parsed
     except Exception as e:
         logging.error(f"Ошибка при запросе к GPT: {e}")
-        return []
\ No newline at end of file
+        return []
+
+class IndexedSentences(Sentences):
+    index: int
+
+class BatchSentences(BaseModel):
+    items: list[IndexedSentences]
+
+async def _context_sentences_batch(entries: Sequence[tuple[str, tuple[str, str, str]]]) -> dict[str, Sentences]:
+    """One batched request for ``(cache_key, item)`` entries; answers are cached and returned by key."""
+    cache = get_llm_cache()
+    listing = "\n".join(
+        f"{n}. {item[0]} | meaning \"{item[1]}\" | {LEVEL_NAMES.get(item[2], item[2])} learner"
+        for n, (_, item) in enumerate(entries)
+    )
+    # a failure of the whole request propagates: N single requests would only add load
+    response = await gateway.parse(
+        "get_context_sentences_batch",
+        model=MODEL,
+        input=[
+            {
+                "role": "system",
+                "content": "You are given numbered English words, each with the Russian meaning to use and the learner level. "
+                           "For every line return its index, a very short sentence (en) with that word which a learner of that level should be able to understand, "
+                           "and the sentence translation in Russian (ru) with the word in the given meaning."
+            },
+            {
+                "role": "user",
+                "content": listing
+            }
+        ],
+        text_format=BatchSentences,
+        max_output_tokens=96 * len(entries) + 64,
+        temperature=0.5,
+        top_p=1,
+    )
+    found: dict[str, Sentences] = {}
+    for item in response.output_parsed.items:
+        if 0 <= item.index < len(entries) and item.en and item.ru:
+            key = entries[item.index][0]
+            if key not in found:
+                found[key] = Sentences(en=item.en, ru=item.ru)
+                await cache.save("get_context_sentences", key, found[key])
+    return found
+
+async def get_context_sentences_batch(items: Sequence[tuple[str, str, str]]) -> list[Optional[Sentences]]:
+    """
+    Context sentences for many (english_word, russian_word, level) triples in one request.
+
+    Results come back in the order of *items*. Answers already cached for
+    get_context_sentences are reused, new ones are cached under the same keys. Concurrent
+    calls missing the same set of words share one batched request (bot/singleflight.py).
+    Items the model skipped fall back to one get_context_sentences call each, so such an
+    item is ``[]`` only if that also failed. If the batched request fails as a whole, the
+    error is raised instead – callers degrade (/tasks within its budget), they don't retry
+    word by word against a struggling upstream.
+    """
+    cache = get_llm_cache()
+    keys = [get_context_sentences.cache_key(*item) for item in items]
+    results: list[Optional[Sentences]] = list(await asyncio.gather(
+        *(cache.lookup("get_context_sentences", key, Sentences) for key in keys)))
+    missing = [i for i, res in enumerate(results) if res is None]
+
+    if len(missing) > 1:
+        by_key = {keys[i]: items[i] for i in missing}
+        flight = tuple(sorted(by_key))           # same words in any order → same request
+        found = await get_singleflight().do(
+            ("get_context_sentences_batch", flight),
+            lambda: _context_sentences_batch([(key, by_key[key]) for key in flight]),
+            "get_context_sentences_batch")
+        for i in missing:
+            results[i] = found.get(keys[i])
+
+    # skipped by a successful batch (or a single item) – one request each
+    missing = [i for i, res in enumerate(results) if res is None]
+    fallback = await asyncio.gather(*(get_context_sentences(*items[i]) for i in missing))
+    for i, res in zip(missing, fallback):
+        results[i] = res
+    return results
@@ -8,4 +8,21 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 DATABASE_URL = os.environ.get("DATABASE_URL")
 BOT_USERNAME = os.environ.get("BOT_USERNAME")
 MINI_APP_URL = os.environ.get("MINI_APP_URL")
-SECRET_KEY = os.environ.get("SECRET_KEY")
\ No newline at end of file
+SECRET_KEY = os.environ.get("SECRET_KEY")
+
+# persistent cache of OpenAI responses (bot/llm_cache.py)
+LLM_CACHE_TTL_DAYS = int(os.environ.get("LLM_CACHE_TTL_DAYS", 30))
+LLM_CACHE_MAX_ROWS = int(os.environ.get("LLM_CACHE_MAX_ROWS", 200_000))
+LLM_CACHE_MEMORY = int(os.environ.get("LLM_CACHE_MEMORY", 4096))   # in-process LRU entries
+
+# OpenAI gateway limits (bot/llm_gateway.py)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 16))
+LLM_FUNCTION_CONCURRENCY = int(os.environ.get("LLM_FUNCTION_CONCURRENCY", 8))
+LLM_RPM = float(os.environ.get("LLM_RPM", 500))            # 0 = unlimited
+LLM_TPM = float(os.environ.get("LLM_TPM", 200_000))        # 0 = unlimited
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", 30))
+LLM_HEDGE_AFTER = float(os.environ.get("LLM_HEDGE_AFTER", 0))  # seconds; 0 = no hedging
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 20))       # seconds per attempt
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", 2))          # by the gateway; the SDK's own are off
+LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF", 0.5))   # seconds, doubled per retry
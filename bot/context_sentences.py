@@ -0,0 +1,120 @@
+"""
+Context sentences stored per (translation, CEFR level).
+
+Once a user adds a word, the translation and their level are fixed, so the sentence for
+the context task is generated right away in the background and saved in
+``context_sentences``. ``/tasks`` then reads it from the table and only asks the LLM for
+rows that are still missing (e.g. generation hasn't finished yet or failed), within a
+time budget – generation that misses it keeps running and is stored for next time.
+"""
+import asyncio
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.ai import Sentences, get_context_sentences, get_context_sentences_batch
+from bot.models import CEFR, ContextSentence
+
+_background: set[asyncio.Task] = set()     # strong refs, otherwise tasks may be GC'd mid-flight
+
+
+def _level(cefr: Optional[CEFR]) -> CEFR:
+    return CEFR(cefr) if cefr else CEFR.A
+
+
+async def _save(session: AsyncSession, items: Sequence[tuple[int, CEFR, Sentences]]) -> None:
+    if not items:
+        return
+    await session.execute(
+        insert(ContextSentence)
+        .values([{"translation_id": t, "level": lvl, "en": s.en, "ru": s.ru} for t, lvl, s in items])
+        .on_conflict_do_nothing(index_elements=["translation_id", "level"])
+    )
+    await session.commit()
+
+
+async def pregenerate(translation_id: int, english_word: str, russian_word: str,
+                      cefr: Optional[CEFR]) -> None:
+    """Generate and store the sentence for one translation, unless it's already there."""
+    from db import async_session_maker
+
+    level = _level(cefr)
+    # two short sessions: no pooled connection is held while OpenAI answers
+    async with async_session_maker() as session:
+        exists = await session.scalar(select(ContextSentence.id).where(
+            ContextSentence.translation_id == translation_id, ContextSentence.level == level))
+    if exists:
+        return
+    res = await get_context_sentences(english_word, russian_word, level)
+    if not res:
+        return                           # /tasks will retry live
+    async with async_session_maker() as session:
+        await _save(session, [(translation_id, level, res)])
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+
+    def done(t: asyncio.Task) -> None:
+        _background.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logging.error(f"Context sentence generation failed: {t.exception()}")
+    task.add_done_callback(done)
+    return task
+
+
+def schedule_pregeneration(translation_id: int, english_word: str, russian_word: str,
+                           cefr: Optional[CEFR]) -> None:
+    """Fire-and-forget :func:`pregenerate`; errors are only logged."""
+    _spawn(pregenerate(translation_id, english_word, russian_word, cefr))
+
+
+async def _generate(items: Sequence[tuple[int, str, str]], level: CEFR) -> list[Optional[Sentences]]:
+    """One batched request for *items*, stored with its own session (the request's may be gone)."""
+    from db import async_session_maker
+
+    generated = await get_context_sentences_batch([(en, ru, level) for _, en, ru in items])
+    try:
+        async with async_session_maker() as session:
+            await _save(session, [(item[0], level, res) for item, res in zip(items, generated) if res])
+    except Exception as e:
+        logging.error(f"Failed to store context sentences: {e}")
+    return generated
+
+
+async def context_sentences_for(session: AsyncSession, items: Sequence[tuple[int, str, str]],
+                                cefr: Optional[CEFR], timeout: Optional[float] = None) -> list[Optional[Sentences]]:
+    """
+    Sentences for ``(translation_id, english_word, russian_word)`` items at the user's level,
+    in order. Stored ones come from the table; the rest are generated in one batched
+    request and stored for next time. ``None`` for an item whose generation failed or
+    didn't finish within *timeout* seconds.
+    """
+    level = _level(cefr)
+    keys = [(t_id, level) for t_id, _, _ in items]
+    stored = {
+        row.translation_id: Sentences(en=row.en, ru=row.ru)
+        for row in (await session.execute(
+            select(ContextSentence).where(
+                tuple_(ContextSentence.translation_id, ContextSentence.level).in_(keys))
+        )).scalars()
+    }
+    results: list[Optional[Sentences]] = [stored.get(t_id) for t_id, _, _ in items]
+
+    missing = [i for i, res in enumerate(results) if res is None]
+    if missing:
+        job = _spawn(_generate([items[i] for i in missing], level))
+        try:
+            generated = await asyncio.wait_for(asyncio.shield(job), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Context sentences for {len(missing)} words not ready in {timeout:.1f}s")
+            generated = [None] * len(missing)
+        except Exception:
+            generated = [None] * len(missing)          # already logged by _spawn
+        for i, res in zip(missing, generated):
+            results[i] = res or None
+    return results
@@ -1,5 +1,6 @@
+import logging
 import random
-from typing import List
+from typing import List, Optional
 
 from aiogram import Router, F
 from aiogram.fsm.state import State, StatesGroup
@@ -8,9 +9,10 @@ from aiogram.utils.formatting import as_list, Text, Bold
 
 from bot.handlers.words import AddWordStates
 from cefr.lexicon import build_lexicon
+from cefr.questions import get_question
 
 LEXICON_DF = build_lexicon()
-from bot.ai import get_translation_options
+from bot.ai import Options, get_translation_options
 
 rng = random.SystemRandom()
 
@@ -147,20 +149,42 @@ async def cancel_start(cb: CallbackQuery):
     await cb.message.edit_reply_markup()
 
 # ────────────────────  asking phase  ────────────────────
+def count_asked(quiz: QuizData, band: str) -> None:
+    """One more *band* word is behind us; after 5 of them the level moves up."""
+    quiz.totals[band] += 1
+    if quiz.totals[band] == 5:
+        quiz.curr = chr(ord(quiz.curr) + 1)
+
+async def get_options(word: str, level: str, attempts: int = 2) -> Optional[Options]:
+    """Pre-built question (cefr/questions.py); live GPT call only if it's missing."""
+    question = get_question(word, level)
+    if question:
+        return Options(**question)
+    for _ in range(attempts):
+        opts = await get_translation_options(word, level)
+        if isinstance(opts, Options) and all(opt for _, opt in opts):
+            return opts
+    return None
+
 async def ask_next_word(chat_id: int, state: FSMContext, msg: Message):
     data = await state.get_data()
     quiz = QuizData(**data["quiz"])
 
-    if not quiz.queue:        # finished
+    while quiz.queue:
+        word, band = quiz.queue.pop(0)           # take next
+        opts = await get_options(word, quiz.curr)
+        if opts is not None:
+            break
+        logging.warning(f"Placement test: no options for {word!r}, skipping it")
+        count_asked(quiz, band)                  # scores as a miss, keeps quiz.curr in step
+    else:                     # finished
         await summarize(chat_id, state, quiz, msg)
         return
 
-    word, band = quiz.queue.pop(0)           # take next
     await state.update_data(quiz=quiz.__dict__,
                             current_word=word,
-                            current_band=band)
-
-    opts = await get_translation_options(word, quiz.curr)    # your GPT call
+                            current_band=band,
+                            current_correct=opts.correct)
 
     buttons = [
         InlineKeyboardButton(text=opt, callback_data=f"ans_{opt}")
@@ -188,18 +212,15 @@ async def check_answer(cb: CallbackQuery, state: FSMContext):
     chosen = cb.data.split("ans_", 1)[1]
     data   = await state.get_data()
     quiz   = QuizData(**data["quiz"])
-    word   = data["current_word"]
     band   = data["current_band"]
+    correct = data["current_correct"]         # saved when the question was asked
 
-    opts = await get_translation_options(word, quiz.curr)
-    quiz.totals[band] += 1
-    if quiz.totals[band] == 5:
-        quiz.curr = chr(ord(quiz.curr) + 1)
-    if chosen == opts.correct:
+    count_asked(quiz, band)
+    if chosen == correct:
         quiz.correct[band] += 1
         resp = "✅ Правильно!"
     else:
-        resp = f"❌ Ошибка. Правильный ответ: {opts.correct}"
+        resp = f"❌ Ошибка. Правильный ответ: {correct}"
 
     # update & continue
     await state.update_data(quiz=quiz.__dict__)
@@ -16,6 +16,7 @@ from sqlalchemy.orm import joinedload
 from bot.models import User, Word, Collection, Translation, AddedWord
 from pydantic import BaseModel
 from bot.ai import TranslationModel, Translations, get_gpt_translations
+from bot.context_sentences import schedule_pregeneration
 
 
 router = Router()
@@ -253,5 +254,8 @@ async def process_collection_choice(
     db_session.add(added)
     await db_session.commit()
 
+    # the context task's sentence is known now – generate it while the user keeps going
+    schedule_pregeneration(translation_obj.id, tr.word, chosen_text, user.cefr)
+
     await callback.message.answer(**Text("Слово ", Bold(tr.word),  f" добавлено в коллекцию с переводом «{chosen_text}».").as_kwargs())
     await state.set_state(AddWordStates.waiting_for_new_word)
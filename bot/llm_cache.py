@@ -0,0 +1,217 @@
+"""
+Persistent cache of OpenAI responses.
+
+The helpers in bot/ai.py are wrapped with :func:`llm_cached`: a call first looks at an
+in-process LRU, then at the ``llm_cache`` table, and only then hits the API. The key is a
+hash of the function name, its normalised arguments, the model and the prompt version –
+bump ``prompt_version`` when a prompt changes so old answers stop being served.
+
+Only successful (parsed) responses are stored; the ``[]`` returned on API errors is not.
+A failing database never breaks the call, the cache is simply skipped.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from bot.config import LLM_CACHE_MAX_ROWS, LLM_CACHE_MEMORY, LLM_CACHE_TTL_DAYS
+from bot.models import LLMCache
+from bot.singleflight import get_singleflight
+
+PRUNE_EVERY = 200        # table writes between TTL / size pruning
+
+
+def normalise(value: Any) -> Any:
+    """``"  Run "`` and ``"run"`` are the same question."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if hasattr(value, "value"):          # enums such as CEFR
+        return normalise(value.value)
+    return value
+
+
+class LLMCacheStore:
+    """In-process LRU in front of the ``llm_cache`` table, with per-function counters."""
+
+    def __init__(self, ttl: timedelta, max_rows: int, memory_entries: int, session_maker=None):
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.memory_entries = memory_entries
+        self._session_maker = session_maker
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()   # key → (expires, json)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def _sessions(self):
+        if self._session_maker is None:
+            from db import async_session_maker
+            self._session_maker = async_session_maker
+        return self._session_maker
+
+    def _count(self, function: str, what: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(
+                function, {"memory_hits": 0, "db_hits": 0, "misses": 0, "db_errors": 0})
+            counters[what] += 1
+
+    @staticmethod
+    def key(function: str, args: dict, model: str, prompt_version: int) -> str:
+        payload = json.dumps({"f": function, "a": {k: normalise(v) for k, v in args.items()},
+                              "m": model, "v": prompt_version}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # ── memory ───────────────────────────────────────────────────────────
+    def _remember(self, key: str, raw: str, created: datetime) -> None:
+        expires = time.time() + (created + self.ttl - datetime.now(timezone.utc)).total_seconds()
+        with self._lock:
+            self._memory[key] = (expires, raw)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _recall(self, key: str) -> Optional[str]:
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return hit[1]
+
+    # ── database ─────────────────────────────────────────────────────────
+    async def _load(self, key: str) -> Optional[tuple[str, datetime]]:
+        async with self._sessions()() as session:
+            row = (await session.execute(
+                select(LLMCache.response, LLMCache.created_at).where(
+                    LLMCache.key == key,
+                    LLMCache.created_at > datetime.now(timezone.utc) - self.ttl,
+                )
+            )).first()
+        return (row.response, row.created_at) if row else None
+
+    async def _store(self, key: str, function: str, raw: str, created: datetime) -> None:
+        async with self._sessions()() as session:
+            await session.execute(
+                insert(LLMCache)
+                .values(key=key, function=function, response=raw, created_at=created)
+                .on_conflict_do_update(index_elements=[LLMCache.key],
+                                       set_={"response": raw, "created_at": created})
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                await self._prune(session)
+            await session.commit()
+
+    async def _prune(self, session) -> None:
+        await session.execute(delete(LLMCache).where(
+            LLMCache.created_at <= datetime.now(timezone.utc) - self.ttl))
+        newest = select(LLMCache.key).order_by(LLMCache.created_at.desc()).offset(self.max_rows)
+        await session.execute(delete(LLMCache).where(LLMCache.key.in_(newest.scalar_subquery())))
+
+    # ── read-through ─────────────────────────────────────────────────────
+    async def lookup(self, function: str, key: str, schema: type[BaseModel]) -> Optional[BaseModel]:
+        """Cached response for *key* (memory, then table) or ``None``."""
+        raw = self._recall(key)
+        if raw is not None:
+            self._count(function, "memory_hits")
+            return schema.model_validate_json(raw)
+
+        try:
+            found = await self._load(key)
+        except Exception as e:
+            self._count(function, "db_errors")
+            logging.warning(f"LLM cache lookup failed: {e}")
+            found = None
+        if found is not None:
+            self._count(function, "db_hits")
+            self._remember(key, *found)
+            return schema.model_validate_json(found[0])
+        self._count(function, "misses")
+        return None
+
+    async def save(self, function: str, key: str, result: BaseModel) -> None:
+        raw, created = result.model_dump_json(), datetime.now(timezone.utc)
+        self._remember(key, raw, created)
+        try:
+            await self._store(key, function, raw, created)
+        except Exception as e:
+            self._count(function, "db_errors")
+            logging.warning(f"LLM cache write failed: {e}")
+
+    async def get_or_call(self, function: str, key: str, schema: type[BaseModel],
+                          call: Callable[[], Awaitable[Any]]) -> Any:
+        cached = await self.lookup(function, key, schema)
+        if cached is not None:
+            return cached
+        result = await call()
+        if isinstance(result, schema):          # not [] / None from API errors – retry next time
+            await self.save(function, key, result)
+        return result
+
+    # ── metrics ──────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            out = {"memory_entries": len(self._memory), "functions": {}}
+            for function, c in self._counters.items():
+                lookups = c["memory_hits"] + c["db_hits"] + c["misses"]
+                out["functions"][function] = {
+                    **c,
+                    "hit_ratio": round((c["memory_hits"] + c["db_hits"]) / lookups, 3) if lookups else None,
+                }
+        return out
+
+
+_store: Optional[LLMCacheStore] = None
+
+
+def get_llm_cache() -> LLMCacheStore:
+    global _store
+    if _store is None:
+        _store = LLMCacheStore(
+            ttl=timedelta(days=LLM_CACHE_TTL_DAYS),
+            max_rows=LLM_CACHE_MAX_ROWS,
+            memory_entries=LLM_CACHE_MEMORY,
+        )
+    return _store
+
+
+def llm_cached(schema: type[BaseModel], model: str, prompt_version: int = 1):
+    """Read the decorated OpenAI helper through the persistent cache.
+
+    Concurrent calls with the same key share one cache lookup and at most one API
+    request (bot/singleflight.py). The undecorated coroutine stays available as
+    ``fn.uncached``, the key of a call as ``fn.cache_key(*args)``.
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        def cache_key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return LLMCacheStore.key(fn.__name__, dict(bound.arguments), model, prompt_version)
+
+        @functools.wraps(fn)
+        async def cached(*args, **kwargs):
+            cache = get_llm_cache()
+            key = cache_key(*args, **kwargs)
+            return await get_singleflight().do(
+                key, lambda: cache.get_or_call(fn.__name__, key, schema, lambda: fn(*args, **kwargs)),
+                fn.__name__)
+
+        cached.uncached = fn
+        cached.cache_key = cache_key
+        return cached
+    return decorate
@@ -0,0 +1,297 @@
+"""
+Shared gateway in front of the OpenAI client.
+
+Every request from bot/ai.py goes through :meth:`LLMGateway.parse`, which applies, in order:
+
+* a circuit breaker – after ``LLM_BREAKER_FAILURES`` consecutive upstream failures (5xx,
+  429, timeouts, connection errors; a 400 or an unparsable answer doesn't count) calls fail fast
+  with :class:`CircuitOpen` for ``LLM_BREAKER_COOLDOWN`` seconds, then a single probe
+  decides whether to close it again;
+* a global and a per-function concurrency cap;
+* requests- and tokens-per-minute token buckets (tokens are estimated from the prompt and
+  ``max_output_tokens``, then corrected with the reported usage);
+* optional hedging – if the answer isn't there after ``LLM_HEDGE_AFTER`` seconds a second
+  identical request is sent and the first answer wins;
+* up to ``LLM_RETRIES`` retries of upstream failures with jittered exponential backoff
+  (a 429's ``Retry-After`` is honoured up to ``RETRY_AFTER_CAP``); every retry goes
+  through the breaker, the slots and the buckets again.
+
+The OpenAI client is created with ``LLM_TIMEOUT`` per attempt and ``max_retries=0``: retries
+inside the SDK would hold a slot, bypass the buckets and hide failures from the breaker.
+
+The helpers already turn exceptions into ``[]``, so a tripped breaker degrades like any
+other upstream error. The client honours ``OPENAI_BASE_URL``, which is how it is pointed
+at a local fake server for load tests.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+
+from bot.config import LLM_BREAKER_COOLDOWN, LLM_BREAKER_FAILURES, LLM_FUNCTION_CONCURRENCY, \
+    LLM_HEDGE_AFTER, LLM_MAX_CONCURRENCY, LLM_RETRIES, LLM_RETRY_BACKOFF, LLM_RPM, LLM_TIMEOUT, LLM_TPM
+
+RETRY_AFTER_CAP = 10.0      # seconds; a longer Retry-After is not waited out
+
+
+class CircuitOpen(Exception):
+    """Upstream is considered unhealthy; the request was not sent."""
+
+
+class TokenBucket:
+    """``per_minute`` units per minute, bursts up to the same amount; 0 = unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def take(self, n: float) -> None:
+        if self.rate <= 0:
+            return
+        n = min(n, self.capacity)
+        async with self._lock:               # FIFO: nobody overtakes a waiting request
+            self._refill()
+            while self.level < n:
+                await asyncio.sleep((n - self.level) / self.rate)
+                self._refill()
+            self.level -= n
+
+    def adjust(self, n: float) -> None:
+        """Charge (``n > 0``) or refund (``n < 0``) after the fact."""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.level = min(self.capacity, self.level - n)
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+
+    def allow(self) -> tuple[bool, bool]:
+        """``(allowed, probe)`` – *probe* is set for the single half-open trial request."""
+        if self.state == "closed":
+            return True, False
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+            self.state, self._probing = "half_open", False
+        if self.state == "half_open" and not self._probing:
+            self._probing = True                 # exactly one probe request
+            return True, True
+        return False, False
+
+    def success(self) -> None:
+        self.state, self._consecutive, self._probing = "closed", 0, False
+
+    def abandon(self) -> None:
+        """The probe was cancelled – let the next call probe instead."""
+        if self.state == "half_open":
+            self._probing = False
+
+    def failure(self) -> None:
+        self._consecutive += 1
+        if self.state == "half_open" or (self.failures and self._consecutive >= self.failures):
+            if self.state != "open":
+                self.trips += 1
+            self.state, self._opened_at, self._probing = "open", time.monotonic(), False
+
+
+def _upstream_error(e: BaseException) -> bool:
+    """Whether *e* says something about upstream health (vs. a bad request or answer)."""
+    if isinstance(e, APIStatusError):
+        return e.status_code >= 500 or e.status_code == 429
+    return isinstance(e, (APIConnectionError, asyncio.TimeoutError))    # incl. APITimeoutError
+
+
+def _backoff(e: BaseException, attempt: int, base: float) -> float:
+    """Seconds before retry number ``attempt + 1``."""
+    delay = base * 2 ** attempt * (0.5 + random.random())
+    if isinstance(e, APIStatusError):
+        try:
+            delay = max(delay, float(e.response.headers.get("retry-after", 0)))
+        except ValueError:
+            pass                                 # HTTP-date form – keep our own backoff
+    return min(delay, RETRY_AFTER_CAP)
+
+
+def _estimate_tokens(kwargs: dict) -> int:
+    prompt = sum(len(str(m.get("content", ""))) for m in kwargs.get("input", []) if isinstance(m, dict))
+    return prompt // 4 + int(kwargs.get("max_output_tokens") or 256)
+
+
+class LLMGateway:
+    def __init__(self, client: AsyncOpenAI, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 function_concurrency: int = LLM_FUNCTION_CONCURRENCY, rpm: float = LLM_RPM,
+                 tpm: float = LLM_TPM, breaker_failures: int = LLM_BREAKER_FAILURES,
+                 breaker_cooldown: float = LLM_BREAKER_COOLDOWN, hedge_after: float = LLM_HEDGE_AFTER,
+                 retries: int = LLM_RETRIES, retry_backoff: float = LLM_RETRY_BACKOFF):
+        self.client = client
+        self.function_concurrency = function_concurrency
+        self.hedge_after = hedge_after
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = CircuitBreaker(breaker_failures, breaker_cooldown)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_function: dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=1024)
+        self.max_concurrency = max_concurrency
+
+        self.in_flight = 0
+        self.queued = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.retried = 0
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def _count(self, function: str, what: str, delta: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(
+                function, {"calls": 0, "in_flight": 0, "failed": 0, "rejected": 0})
+            counters[what] += delta
+
+    def _semaphore(self, function: str) -> asyncio.Semaphore:
+        sem = self._per_function.get(function)
+        if sem is None:
+            sem = self._per_function[function] = asyncio.Semaphore(self.function_concurrency)
+        return sem
+
+    async def _send(self, kwargs: dict, estimate: int):
+        await self.requests.take(1)
+        await self.tokens.take(estimate)
+        response = await self.client.responses.parse(**kwargs)
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self.tokens.adjust(usage.total_tokens - estimate)
+        return response
+
+    async def _hedged(self, kwargs: dict, estimate: int):
+        attempts = [asyncio.ensure_future(self._send(kwargs, estimate))]
+        try:
+            if self.hedge_after > 0:
+                done, _ = await asyncio.wait(attempts, timeout=self.hedge_after)
+                if not done:
+                    self.hedged += 1
+                    attempts.append(asyncio.ensure_future(self._send(kwargs, estimate)))
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not attempts[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                if not pending:
+                    raise next(iter(done)).exception()
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    async def parse(self, function: str, **kwargs) -> Any:
+        """``client.responses.parse(**kwargs)`` under the gateway's limits, with retries."""
+        self._count(function, "calls")
+        allowed, probe = self.breaker.allow()
+        if not allowed:
+            self._count(function, "rejected")
+            raise CircuitOpen("OpenAI circuit breaker is open")
+
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(function, probe, kwargs)
+            except Exception as e:
+                if attempt >= self.retries or not _upstream_error(e):
+                    self._count(function, "failed")
+                    raise
+                await asyncio.sleep(_backoff(e, attempt, self.retry_backoff))
+                attempt += 1
+                allowed, probe = self.breaker.allow()
+                if not allowed:                  # tripped meanwhile – don't pile onto it
+                    self._count(function, "failed")
+                    raise
+                self.retried += 1
+
+    async def _attempt(self, function: str, probe: bool, kwargs: dict) -> Any:
+        queued_at = time.monotonic()
+        self.queued += 1
+        try:
+            # per-function slot first: a burst of one helper mustn't sit on global slots
+            async with self._semaphore(function), self._global:
+                self.queued -= 1
+                queued_at, waited = None, time.monotonic() - queued_at
+                self._waits.append(waited)
+                self.in_flight += 1
+                self._count(function, "in_flight")
+                try:
+                    response = await self._hedged(kwargs, _estimate_tokens(kwargs))
+                except Exception as e:
+                    if _upstream_error(e):
+                        self.breaker.failure()
+                    else:
+                        self.breaker.success()       # upstream answered, the request itself was bad
+                    raise
+                finally:
+                    self.in_flight -= 1
+                    self._count(function, "in_flight", -1)
+        except asyncio.CancelledError:
+            if probe:                            # calls admitted before a trip don't own the probe
+                self.breaker.abandon()
+            raise
+        finally:
+            if queued_at is not None:            # left while still waiting for a slot
+                self.queued -= 1
+        self.breaker.success()
+        return response
+
+    # ── metrics ──────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            functions = {k: dict(v) for k, v in self._counters.items()}
+
+        def pct(q: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 2)
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "breaker": {"state": self.breaker.state, "trips": self.breaker.trips},
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "retried": self.retried,
+            "queue_wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+            "functions": functions,
+        }
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(AsyncOpenAI(timeout=LLM_TIMEOUT, max_retries=0))
+    return _gateway
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, Text, Enum as PgEnum
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, Text, UniqueConstraint, Enum as PgEnum
 from sqlalchemy.types import TIMESTAMP
 
 from enum import Enum
@@ -64,3 +64,21 @@ class AddedWord(Base):
     word = relationship("Word", back_populates="added_words", lazy="selectin")
     translation = relationship("Translation", back_populates="added_words", lazy="selectin")
     collection = relationship("Collection", back_populates="added_words")
+
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)          # sha256 of function, inputs, model, prompt version
+    function = Column(String, nullable=False)
+    response = Column(Text, nullable=False)             # JSON of the parsed pydantic model
+    created_at = Column(type_=TIMESTAMP(timezone=True), nullable=False, index=True)
+
+class ContextSentence(Base):
+    __tablename__ = "context_sentences"
+    __table_args__ = (UniqueConstraint("translation_id", "level"),)
+
+    id = Column(Integer, primary_key=True)
+    translation_id = Column(Integer, ForeignKey("translations.id", ondelete="CASCADE"), nullable=False)
+    level = Column(PgEnum(CEFR), nullable=False)
+    en = Column(Text, nullable=False)
+    ru = Column(Text, nullable=False)
@@ -0,0 +1,66 @@
+"""
+Single-flight coalescing: concurrent calls with the same key share one execution.
+
+The first caller starts the work, callers arriving while it runs await the same task.
+The result – or the exception – is delivered to all of them. A caller that is cancelled
+just stops waiting; the shared task is cancelled only once nobody waits for it any more.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: dict[Hashable, tuple[asyncio.Task, list[int]]] = {}
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def _count(self, name: str, what: str) -> None:
+        counters = self._counters.setdefault(name, {"calls": 0, "coalesced": 0})
+        counters[what] += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], name: str = "default") -> Any:
+        with self._lock:
+            self._count(name, "calls")
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._count(name, "coalesced")
+                flight[1][0] += 1
+            else:
+                task = asyncio.ensure_future(fn())
+                flight = self._inflight[key] = (task, [1])
+                task.add_done_callback(lambda t: self._forget(key, t))
+        task, waiters = flight
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            with self._lock:
+                waiters[0] -= 1
+                if waiters[0] == 0 and not task.done():
+                    task.cancel()          # the last interested caller went away
+                    if self._inflight.get(key, (None,))[0] is task:
+                        del self._inflight[key]    # newcomers start afresh, not join the cancelled task
+            raise
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(key, (None,))[0] is task:
+                del self._inflight[key]
+        if not task.cancelled():
+            task.exception()               # retrieved by the waiters; silence "never retrieved"
+
+    # ── metrics ──────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._inflight), "functions": {k: dict(v) for k, v in self._counters.items()}}
+
+
+_group: Optional[SingleFlight] = None
+
+
+def get_singleflight() -> SingleFlight:
+    global _group
+    if _group is None:
+        _group = SingleFlight()
+    return _group
@@ -0,0 +1,105 @@
+"""
+Готовый банк вопросов для placement-теста (bot/handlers/start.py).
+
+Для каждого слова лексикона и уровня заранее генерируются правильный перевод и
+9 дистракторов (``get_translation_options``), так что тест обходится без
+обращений к LLM. Сборка офлайн, пачками по ``--concurrency`` запросов;
+результат дописывается построчно, поэтому прерванную сборку можно продолжить::
+
+    python -m cefr.questions                 # уровень = band слова (как в тесте)
+    python -m cefr.questions --levels A B C  # все слова на всех уровнях
+"""
+import argparse
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Sequence
+
+from cefr.lexicon import DATA_DIR, build_lexicon
+
+QUESTIONS_PATH = DATA_DIR / "data/questions.jsonl"
+
+
+def _read(path: Path) -> dict[tuple[str, str], dict]:
+    bank = {}
+    try:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:      # оборванная последняя строка
+                    continue
+                bank[entry.pop("word"), entry.pop("level")] = entry
+    except FileNotFoundError:
+        pass
+    return bank
+
+
+@lru_cache(maxsize=None)
+def load_questions(path: Path = QUESTIONS_PATH) -> dict[tuple[str, str], dict]:
+    """``(word, level) → {"correct", "wrong1", …, "wrong9"}``."""
+    bank = _read(path)
+    logging.info(f"Placement question bank: {len(bank)} questions")
+    return bank
+
+
+def get_question(word: str, level: str) -> Optional[dict]:
+    return load_questions().get((word, level))
+
+
+# ────────────────────────────  сборка  ────────────────────────────
+async def build(path: Path = QUESTIONS_PATH, levels: Optional[Sequence[str]] = None,
+                concurrency: int = 16, limit: Optional[int] = None) -> dict:
+    from bot.ai import get_translation_options
+
+    lexicon = build_lexicon().drop_duplicates(subset=["word", "band"])
+    todo = [
+        (word, level)
+        for word, band in zip(lexicon["word"], lexicon["band"])
+        for level in (levels or (band,))
+    ]
+    if path.exists():                             # отрезаем оборванную последнюю строку
+        raw = path.read_bytes()
+        if raw and not raw.endswith(b"\n"):
+            with open(path, "r+b") as fh:
+                fh.truncate(raw.rfind(b"\n") + 1)
+    done = _read(path)
+    todo = [key for key in todo if key not in done][:limit]
+    print(f"{len(done)} questions built, {len(todo)} to go")
+
+    stats = {"written": 0, "failed": 0}
+    with open(path, "a", encoding="utf-8") as out:
+        for start in range(0, len(todo), concurrency):
+            batch = todo[start:start + concurrency]
+            # мимо кэша: офлайн-сборке не нужна база
+            results = await asyncio.gather(
+                *(get_translation_options.uncached(word, level) for word, level in batch))
+            for (word, level), opts in zip(batch, results):
+                if not opts:                      # ошибка API – достроится при следующем запуске
+                    stats["failed"] += 1
+                    continue
+                out.write(json.dumps({"word": word, "level": level, **opts.model_dump()},
+                                     ensure_ascii=False) + "\n")
+                stats["written"] += 1
+            out.flush()
+            print(f"  {start + len(batch)}/{len(todo)}")
+    load_questions.cache_clear()
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pre-generate placement test questions")
+    parser.add_argument("--out", type=Path, default=QUESTIONS_PATH)
+    parser.add_argument("--levels", nargs="+", choices=["A", "B", "C"],
+                        help="levels to build for every word (default: the word's own band)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=None, help="build at most N questions this run")
+    args = parser.parse_args(argv)
+    stats = asyncio.run(build(args.out, args.levels, args.concurrency, args.limit))
+    print(f"Done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
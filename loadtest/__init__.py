@@ -0,0 +1,4 @@
+"""
+Offline load testing: a fake OpenAI server (:mod:`loadtest.openai_stub`) and a harness
+that drives the API and the bot dispatcher against it (:mod:`loadtest.harness`).
+"""
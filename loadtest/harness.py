@@ -0,0 +1,447 @@
+"""
+Load harness: drives the FastAPI app and the aiogram dispatcher at a target rate and
+reports throughput and latency percentiles per endpoint and per bot handler.
+
+Start the OpenAI stub, then point the harness at it::
+
+    python -m loadtest.openai_stub --port 8090 &
+    python -m loadtest.harness --openai-base-url http://127.0.0.1:8090/v1 \\
+        --api-rate 40 --bot-rate 10 --duration 60 --users 50 --json report.json
+
+The app and the dispatcher run in this process on one event loop, as in main.py, against
+the database in ``DATABASE_URL``. ``--base-url`` sends the API load to a running server
+instead (it has to be pointed at the stub itself); the bot is always driven in-process,
+with a fake Bot API session (loadtest/telegram.py).
+
+Virtual users are the Telegram ids ``--user-base`` … ``--user-base + --users - 1``. Before
+the timed run each of them creates a collection and adds ``--seed-words`` words through the
+bot, then logs in to the API with signed ``initData``, so /learning, /repeat and /tasks have
+something to serve. Arrivals are open-loop: a slow server does not lower the offered rate,
+requests beyond ``--max-in-flight`` are counted as dropped instead.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Generator, Optional
+
+import httpx
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.dispatcher.middlewares.base import BaseMiddleware
+
+from loadtest.telegram import FakeTelegramSession, UpdateFactory, forge_init_data
+
+# common words the bot's spell checker accepts
+WORDS = [
+    "house", "water", "time", "hand", "city", "word", "place", "friend", "voice", "table",
+    "window", "book", "morning", "road", "evening", "wind", "field", "river", "garden", "snow",
+    "game", "thought", "color", "sound", "fire", "bridge", "answer", "letter", "money", "music",
+    "school", "story", "teacher", "train", "weather", "winter", "summer", "island", "forest", "kitchen",
+]
+
+# name → weight; {collection_id} is one of the user's collections
+ENDPOINTS = {
+    "GET /tasks/{collection_id}": 4,
+    "GET /learning/{collection_id}": 2,
+    "GET /repeat/{collection_id}": 2,
+    "GET /collections/": 1,
+}
+
+
+# ── measurements ─────────────────────────────────────────────────────────
+class Recorder:
+    """Latency samples, failures and free-form notes (status codes, drops, …) per name."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.failures: Counter[str] = Counter()
+        self.notes: dict[str, Counter[str]] = defaultdict(Counter)
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def record(self, name: str, seconds: float, ok: bool = True) -> None:
+        self.samples[name].append(seconds)
+        if not ok:
+            self.failures[name] += 1
+
+    def note(self, name: str, what: str) -> None:
+        self.notes[name][what] += 1
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+
+    def stop(self) -> None:
+        self.finished = time.monotonic()
+
+    def report(self) -> dict:
+        elapsed = (self.finished or time.monotonic()) - (self.started or time.monotonic())
+
+        def pct(values: list[float], q: float) -> Optional[float]:
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+        out = {}
+        for name in sorted(set(self.samples) | set(self.notes)):
+            values = sorted(self.samples.get(name, []))
+            out[name] = {
+                "count": len(values),
+                "failed": self.failures[name],
+                "rps": round(len(values) / elapsed, 2) if elapsed > 0 else None,
+                "latency_ms": {"p50": pct(values, 0.50), "p95": pct(values, 0.95),
+                               "p99": pct(values, 0.99), "max": pct(values, 1.0)},
+                "notes": dict(self.notes.get(name, {})),
+            }
+        return {"duration_s": round(elapsed, 2), "endpoints": out}
+
+
+def format_report(report: dict) -> str:
+    rows = [("", "count", "failed", "rps", "p50 ms", "p95 ms", "p99 ms", "max ms", "")]
+    for name, r in report["endpoints"].items():
+        latency = r["latency_ms"]
+        rows.append((name, r["count"], r["failed"], r["rps"], latency["p50"], latency["p95"],
+                     latency["p99"], latency["max"],
+                     ", ".join(f"{k}: {v}" for k, v in sorted(r["notes"].items()))))
+    rows = [tuple("-" if v is None else str(v) for v in row) for row in rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = [f"{report['duration_s']} s"]
+    for row in rows:
+        lines.append("  ".join([row[0].ljust(widths[0]), *(v.rjust(w) for v, w in zip(row[1:-1], widths[1:-1])),
+                                row[-1]]).rstrip())
+    return "\n".join(lines)
+
+
+async def run_at_rate(rate: float, duration: float, fire: Callable[[int], Awaitable[None]],
+                      recorder: Recorder, name: str, max_in_flight: int = 256,
+                      poisson: bool = False, drain: float = 30.0) -> None:
+    """Call ``fire(n)`` *rate* times a second for *duration* seconds without waiting for it."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random()
+    in_flight: set[asyncio.Task] = set()
+    start = next_at = loop.time()
+    n = 0
+    while next_at < start + duration:
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+        if len(in_flight) >= max_in_flight:
+            recorder.note(name, "dropped")
+        else:
+            task = asyncio.create_task(fire(n))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        n += 1
+        next_at += rng.expovariate(rate) if poisson else 1 / rate
+    if in_flight:
+        _, late = await asyncio.wait(in_flight, timeout=drain)
+        for task in late:
+            task.cancel()
+            recorder.note(name, "cancelled at the end")
+
+
+# ── API ──────────────────────────────────────────────────────────────────
+class ApiLoad:
+    def __init__(self, client: httpx.AsyncClient, users: list[int], bot_token: str, recorder: Recorder,
+                 endpoints: Optional[dict[str, int]] = None):
+        self.client = client
+        self.users = users
+        self.bot_token = bot_token
+        self.recorder = recorder
+        self.endpoints = endpoints or ENDPOINTS
+        self.tokens: dict[int, str] = {}
+        self.collections: dict[int, list[int]] = {}
+        self._rng = random.Random(0)
+
+    async def _request(self, name: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(name, time.perf_counter() - started, ok=False)
+            self.recorder.note(name, type(e).__name__)
+            return None
+        self.recorder.record(name, time.perf_counter() - started, ok=response.status_code < 400)
+        if response.status_code >= 400:
+            self.recorder.note(name, f"HTTP {response.status_code}")
+        if int(response.headers.get("X-Tasks-Degraded", 0)):
+            self.recorder.note(name, "degraded")
+        return response
+
+    async def _refresh_collections(self, telegram_id: int) -> None:
+        response = await self._request("GET /collections/", "GET", "/collections/",
+                                       headers=self._auth(telegram_id))
+        if response is not None and response.status_code == 200:
+            self.collections[telegram_id] = [c["id"] for c in response.json()]
+
+    def _auth(self, telegram_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[telegram_id]}"}
+
+    async def login(self, telegram_id: int) -> bool:
+        response = await self._request("POST /auth/", "POST", "/auth/",
+                                       json={"initData": forge_init_data(telegram_id, self.bot_token)})
+        if response is None or response.status_code != 200:
+            return False
+        self.tokens[telegram_id] = response.json()["access_token"]
+        await self._refresh_collections(telegram_id)
+        return True
+
+    async def login_all(self, concurrency: int = 16) -> int:
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(telegram_id: int) -> bool:
+            async with limit:
+                return await self.login(telegram_id)
+        return sum(await asyncio.gather(*(one(u) for u in self.users)))
+
+    async def fire(self, n: int) -> None:
+        telegram_id = self.users[n % len(self.users)]
+        if telegram_id not in self.tokens:
+            await self.login(telegram_id)
+            return
+        name = self._rng.choices(list(self.endpoints), weights=list(self.endpoints.values()))[0]
+        if "{collection_id}" in name and not self.collections.get(telegram_id):
+            await self._refresh_collections(telegram_id)       # nothing to ask about yet
+            return
+        method, path = name.split(" ", 1)
+        path = path.format(collection_id=self._rng.choice(self.collections.get(telegram_id) or [0]))
+        await self._request(name, method, path, headers=self._auth(telegram_id))
+
+
+# ── bot ──────────────────────────────────────────────────────────────────
+class HandlerTimer(BaseMiddleware):
+    """Inner middleware: time every handler call, named after the handler function."""
+
+    def __init__(self, recorder: Recorder, kind: str):
+        self.recorder = recorder
+        self.kind = kind
+
+    async def __call__(self, handler, event, data):
+        name = f"{self.kind} {data['handler'].callback.__name__}"
+        started, ok = time.perf_counter(), False
+        try:
+            result = await handler(event, data)
+            ok = True
+            return result
+        finally:
+            self.recorder.record(name, time.perf_counter() - started, ok)
+
+
+Step = tuple[str, str]          # ("text", "/start") or ("press", "<callback_data prefix>")
+
+
+class BotLoad:
+    """Scripted users chatting with the dispatcher; one step (update) per arrival."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, session: FakeTelegramSession, users: list[int],
+                 recorder: Recorder, placement_share: float = 0.05):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.updates = UpdateFactory(bot)
+        self.users = users
+        self.placement_share = placement_share
+        self.timers = [HandlerTimer(recorder, "message"), HandlerTimer(recorder, "callback")]
+        dp.message.middleware(self.timers[0])
+        dp.callback_query.middleware(self.timers[1])
+        self.recorder = recorder
+        self._idle = deque(users)
+        self._scripts: dict[int, tuple[Generator[Step, bool, None], Step]] = {}
+
+    @property
+    def recorder(self) -> Recorder:
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, recorder: Recorder) -> None:
+        self._recorder = recorder
+        for timer in self.timers:
+            timer.recorder = recorder
+
+    def _script(self, rng: random.Random) -> Generator[Step, bool, None]:
+        """What a user does; ``yield`` tells whether the step could be taken."""
+        yield "text", "/start"
+        while True:
+            if rng.random() < self.placement_share:
+                yield "text", "/start"
+                if (yield "press", "start_test"):
+                    while (yield "press", "ans_"):
+                        pass
+                    yield "press", "lvl_"
+            else:
+                yield "text", rng.choice(WORDS)
+                if not ((yield "press", "tr_") and (yield "press", "col_")):
+                    yield "text", "/start"      # lost the thread (API error, no collection) – reset the FSM
+
+    async def send(self, telegram_id: int, step: Step) -> bool:
+        kind, value = step
+        if kind == "text":
+            update = self.updates.message(telegram_id, value)
+        else:
+            shown = self.session.button(telegram_id, value)
+            if shown is None:
+                return False
+            update = self.updates.callback(telegram_id, shown[0], shown[1])
+        try:
+            result = await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            self.recorder.note("bot updates", type(e).__name__)
+            logging.debug(f"Update {step} of {telegram_id} failed: {e}")
+            return False
+        if result is UNHANDLED:
+            self.recorder.note("bot updates", "unhandled")
+        return True
+
+    async def step(self, telegram_id: int) -> None:
+        """Send the user's next update, skipping buttons that aren't there."""
+        script, step = self._scripts.get(telegram_id) or (None, None)
+        if script is None:
+            script = self._script(random.Random(telegram_id))
+            step = next(script)
+        for _ in range(8):                  # a missing button costs no update – go on to the next step
+            taken = await self.send(telegram_id, step)
+            kind, step = step[0], script.send(taken)
+            if taken or kind == "text":
+                break
+        self._scripts[telegram_id] = (script, step)
+
+    async def fire(self, n: int) -> None:
+        if not self._idle:
+            self.recorder.note("bot updates", "all users busy")
+            return
+        telegram_id = self._idle.popleft()
+        try:
+            await self.step(telegram_id)
+        finally:
+            self._idle.append(telegram_id)
+
+    async def seed(self, telegram_id: int, words: int) -> None:
+        """A collection with *words* words, via the real handlers."""
+        for text in ("/start", "/create_collection", "loadtest"):
+            await self.send(telegram_id, ("text", text))
+        for word in random.Random(telegram_id).sample(WORDS, words):
+            await self.send(telegram_id, ("text", word))
+            if await self.send(telegram_id, ("press", "tr_")):
+                await self.send(telegram_id, ("press", "col_"))
+
+    async def seed_all(self, words: int, concurrency: int = 16) -> None:
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(telegram_id: int) -> None:
+            async with limit:
+                await self.seed(telegram_id, words)
+        await asyncio.gather(*(one(u) for u in self.users))
+
+
+# ── run ──────────────────────────────────────────────────────────────────
+async def _get_json(client: httpx.AsyncClient, url: str, **kwargs) -> Any:
+    try:
+        response = await client.get(url, **kwargs)
+        return response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    # imported late: bot.ai builds its OpenAI client from the environment set in main()
+    from backend.api import build_api
+    from bot.bot_app import build_bot_and_dispatcher
+    from bot.config import BOT_TOKEN
+    from db import shutdown_db
+
+    users = list(range(args.user_base, args.user_base + args.users))
+    recorder = Recorder()
+
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+            stack.push_async_callback(shutdown_db)
+        else:
+            app = build_api()
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app",
+                                       timeout=args.timeout)
+        await stack.enter_async_context(client)
+
+        _, dp = build_bot_and_dispatcher()
+        session = FakeTelegramSession(latency=args.telegram_latency)
+        bot = Bot(token=BOT_TOKEN, session=session)
+        bot_load = BotLoad(dp, bot, session, users, Recorder(), args.placement_share)
+        api_load = ApiLoad(client, users, BOT_TOKEN, Recorder())
+
+        if args.seed_words:
+            print(f"Seeding {len(users)} users with {args.seed_words} words each …")
+            await bot_load.seed_all(args.seed_words)
+        if args.api_rate:
+            print(f"Logged in {await api_load.login_all()}/{len(users)} users")
+
+        bot_load.recorder = api_load.recorder = recorder
+        jobs = []
+        if args.api_rate:
+            jobs.append(run_at_rate(args.api_rate, args.duration, api_load.fire, recorder, "api requests",
+                                    args.max_in_flight, args.poisson))
+        if args.bot_rate:
+            jobs.append(run_at_rate(args.bot_rate, args.duration, bot_load.fire, recorder, "bot updates",
+                                    args.max_in_flight, args.poisson))
+        print(f"Running for {args.duration:g} s …")
+        recorder.start()
+        await asyncio.gather(*jobs)
+        recorder.stop()
+
+        report = recorder.report()
+        report["telegram_calls"] = dict(session.calls)
+        report["server_metrics"] = await _get_json(
+            client, "/metrics/", headers={"Authorization": f"Bearer {args.metrics_token}"}
+        ) if args.metrics_token else None
+    if args.openai_base_url:
+        async with httpx.AsyncClient(timeout=5) as stub:
+            report["openai_stub"] = await _get_json(stub, args.openai_base_url.rstrip("/").removesuffix("/v1") + "/stats")
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Drive the API and the bot at a target rate")
+    parser.add_argument("--api-rate", type=float, default=20.0, help="API requests per second (0 = off)")
+    parser.add_argument("--bot-rate", type=float, default=5.0, help="bot updates per second (0 = off)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--user-base", type=int, default=900_000_000, help="first virtual Telegram id")
+    parser.add_argument("--seed-words", type=int, default=2, help="words each user adds before the run")
+    parser.add_argument("--placement-share", type=float, default=0.05,
+                        help="share of bot conversations that take the placement test")
+    parser.add_argument("--base-url", help="running API (e.g. http://localhost:8000) instead of in-process")
+    parser.add_argument("--metrics-token", default=os.environ.get("METRICS_TOKEN"),
+                        help="METRICS_TOKEN of the --base-url server (in-process: a fresh one)")
+    parser.add_argument("--openai-base-url", help="OpenAI stub, e.g. http://127.0.0.1:8090/v1")
+    parser.add_argument("--telegram-latency", type=float, default=0.0,
+                        help="simulated Bot API round trip, seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    parser.add_argument("--timeout", type=float, default=30.0, help="API request timeout, seconds")
+    parser.add_argument("--json", dest="json_path", help="also write the full report here")
+    args = parser.parse_args(argv)
+
+    if args.openai_base_url:
+        os.environ["OPENAI_BASE_URL"] = args.openai_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+    elif not os.environ.get("OPENAI_BASE_URL"):
+        parser.error("refusing to load-test against the real OpenAI API: pass --openai-base-url")
+
+    if not args.base_url:
+        # the in-process app reads its settings on import, i.e. after this
+        args.metrics_token = os.environ["METRICS_TOKEN"] = args.metrics_token or secrets.token_urlsafe(16)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run(args))
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Local stand-in for the OpenAI Responses API, so load tests cost neither money nor network.
+
+It answers ``POST /v1/responses`` – what ``client.responses.parse`` sends – with a
+deterministic structured output for the schema named in ``text.format``: the
+``Translations``, ``Options``, ``Sentences`` and ``BatchSentences`` models of bot/ai.py get
+plausible payloads derived from the prompt (same prompt → same answer), any other schema is
+filled in generically. Latency is drawn from a configurable distribution, per schema if
+needed, and a share of requests fails with 500 or 429::
+
+    python -m loadtest.openai_stub --port 8090 --latency lognormal:0.4,0.5 \\
+        --latency Translations=uniform:0.8,1.6 --error-rate 0.02 --rate-limit-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8090/v1 python main.py
+
+``GET /stats`` returns request counts and the latencies actually served.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+# ── latency ──────────────────────────────────────────────────────────────
+_DISTRIBUTIONS: dict[str, Callable[[random.Random, list[float]], float]] = {
+    "fixed":     lambda rng, p: p[0],
+    "uniform":   lambda rng, p: rng.uniform(p[0], p[1]),
+    "exp":       lambda rng, p: rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0,
+    # median, sigma of the underlying normal
+    "lognormal": lambda rng, p: p[0] * rng.lognormvariate(0, p[1]),
+}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """``"fixed:0.2"``, ``"uniform:0.1,0.5"``, ``"exp:0.3"`` or ``"lognormal:0.3,0.5"`` (seconds)."""
+    kind, _, params = spec.partition(":")
+    if kind not in _DISTRIBUTIONS:
+        raise ValueError(f"unknown latency distribution {kind!r}, expected one of {', '.join(_DISTRIBUTIONS)}")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"bad latency parameters in {spec!r}") from None
+    need = {"fixed": 1, "exp": 1, "uniform": 2, "lognormal": 2}[kind]
+    if len(values) != need:
+        raise ValueError(f"{kind} latency takes {need} parameter(s), got {spec!r}")
+    sample = _DISTRIBUTIONS[kind]
+    return lambda rng: max(0.0, sample(rng, values))
+
+
+@dataclass
+class StubConfig:
+    latency: str = "lognormal:0.3,0.4"
+    schema_latency: dict[str, str] = field(default_factory=dict)   # schema name → spec
+    error_rate: float = 0.0            # share of requests answered with 500
+    rate_limit_rate: float = 0.0       # share of requests answered with 429
+    seed: Optional[int] = None         # fixes latencies and failures, not payloads (always fixed)
+
+
+# ── payloads ─────────────────────────────────────────────────────────────
+def _digest(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("\x1f".join(parts).encode()).digest()[:8], "big")
+
+
+def _pick(words: list[str], *parts: str) -> str:
+    return words[_digest(*parts) % len(words)]
+
+
+_RU = ["дом", "вода", "время", "рука", "дело", "город", "земля", "слово", "место", "лицо",
+       "друг", "глаз", "голос", "сила", "стол", "окно", "книга", "утро", "дорога", "вечер",
+       "ветер", "поле", "река", "сад", "снег", "игра", "мысль", "цвет", "звук", "огонь"]
+
+
+def _messages(body: dict) -> tuple[str, str]:
+    """(system, user) text of a Responses ``input``."""
+    system, user = [], []
+    items = body.get("input")
+    if isinstance(items, str):
+        return "", items
+    for item in items or []:
+        content = item.get("content", "")
+        if isinstance(content, list):        # [{"type": "input_text", "text": …}]
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        (system if item.get("role") in ("system", "developer") else user).append(str(content))
+    return "\n".join(system), "\n".join(user)
+
+
+def _translations(system: str, user: str) -> dict:
+    word = user.strip().lower() or "word"
+    count = 3 + _digest("n", word) % 3
+    meanings = []
+    for i in range(count):
+        ru = _RU[(_digest(word) + 7 * i) % len(_RU)]
+        meanings.append({
+            "transcription": f"{word}ˈ{i}",
+            "translation": ru,
+            "example_en": f"I can see the {word} from here.",
+            "example_ru": f"Отсюда мне видно {ru}.",
+        })
+    return {"word": word, "translations": meanings}
+
+
+def _options(system: str, user: str) -> dict:
+    word = user.strip().lower() or "word"
+    start = _digest(word, system) % len(_RU)
+    picked = [_RU[(start + i) % len(_RU)] for i in range(10)]        # 10 distinct words
+    return {"correct": picked[0], **{f"wrong{i}": picked[i] for i in range(1, 10)}}
+
+
+def _sentence(word: str, meaning: str) -> dict:
+    return {"en": f"The {word} is here.", "ru": f"Вот {meaning or _pick(_RU, word)}."}
+
+
+def _sentences(system: str, user: str) -> dict:
+    found = re.search(r'meaning "([^"]*)"', system)
+    return _sentence(user.strip() or "word", found.group(1) if found else "")
+
+
+_BATCH_LINE = re.compile(r'^\s*(\d+)\.\s*(.*?)\s*\|\s*meaning\s+"([^"]*)"', re.M)
+
+
+def _batch_sentences(system: str, user: str) -> dict:
+    return {"items": [{"index": int(n), **_sentence(word, meaning)}
+                      for n, word, meaning in _BATCH_LINE.findall(user)]}
+
+
+KNOWN: dict[str, Callable[[str, str], dict]] = {
+    "Translations": _translations,
+    "Options": _options,
+    "Sentences": _sentences,
+    "BatchSentences": _batch_sentences,
+}
+
+
+def from_schema(schema: dict, defs: dict, seed: str, path: str = "$") -> Any:
+    """Any value that validates against a (strict) JSON schema, derived from *seed*."""
+    if "$ref" in schema:
+        return from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, seed, path)
+    for combinator in ("anyOf", "oneOf"):
+        if combinator in schema:
+            options = [s for s in schema[combinator] if s.get("type") != "null"] or schema[combinator]
+            return from_schema(options[0], defs, seed, path)
+    if "enum" in schema:
+        return schema["enum"][_digest(seed, path) % len(schema["enum"])]
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {name: from_schema(sub, defs, seed, f"{path}.{name}")
+                for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [from_schema(schema.get("items", {}), defs, seed, f"{path}[{i}]")
+                for i in range(max(1, schema.get("minItems", 0)))]
+    if kind == "integer":
+        return _digest(seed, path) % 100
+    if kind == "number":
+        return (_digest(seed, path) % 10_000) / 100
+    if kind == "boolean":
+        return bool(_digest(seed, path) % 2)
+    if kind == "null":
+        return None
+    return _pick(_RU, seed, path)
+
+
+def payload(body: dict) -> tuple[str, Any]:
+    """Schema name and the structured answer for a Responses request *body*."""
+    fmt = (body.get("text") or {}).get("format") or {}
+    name = fmt.get("name", "")
+    system, user = _messages(body)
+    if name in KNOWN:
+        return name, KNOWN[name](system, user)
+    if fmt.get("type") == "json_schema":
+        schema = fmt.get("schema") or {}
+        return name, from_schema(schema, schema.get("$defs", {}), system + "\x1f" + user)
+    return name or "text", f"stub answer to: {user[:200]}"
+
+
+def _response(body: dict, text: str, prompt: str) -> dict:
+    input_tokens, output_tokens = len(prompt) // 4 + 1, len(text) // 4 + 1
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "stub"),
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "text": body.get("text") or {"format": {"type": "text"}},
+        "temperature": body.get("temperature"),
+        "top_p": body.get("top_p"),
+        "max_output_tokens": body.get("max_output_tokens"),
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+def _error(status: int, kind: str, message: str, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": kind, "param": None, "code": kind}},
+                        status_code=status, headers=headers)
+
+
+# ── app ──────────────────────────────────────────────────────────────────
+class StubStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters: dict[str, dict[str, int]] = {}
+        self.latencies: dict[str, deque[float]] = {}
+
+    def record(self, name: str, outcome: str, latency: float) -> None:
+        counters = self.counters.setdefault(name, {"ok": 0, "error": 0, "rate_limited": 0})
+        counters[outcome] += 1
+        self.latencies.setdefault(name, deque(maxlen=1024)).append(latency)
+
+    def snapshot(self) -> dict:
+        def pct(values: list[float], q: float) -> Optional[float]:
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+        elapsed = time.monotonic() - self.started
+        out = {}
+        for name, counters in self.counters.items():
+            values = sorted(self.latencies[name])
+            out[name] = {
+                **counters,
+                "rps": round(sum(counters.values()) / elapsed, 2) if elapsed else None,
+                "latency_ms": {"p50": pct(values, 0.50), "p95": pct(values, 0.95), "p99": pct(values, 0.99)},
+            }
+        return out
+
+
+def build_stub(config: Optional[StubConfig] = None) -> FastAPI:
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    default_latency = parse_latency(config.latency)
+    latencies = {name: parse_latency(spec) for name, spec in config.schema_latency.items()}
+    stats = StubStats()
+
+    app = FastAPI(title="OpenAI stub", docs_url=None, redoc_url=None)
+    app.state.config, app.state.stats = config, stats
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        name, answer = payload(body)
+        delay = latencies.get(name, default_latency)(rng)
+        roll = rng.random()
+        await asyncio.sleep(delay)
+
+        if roll < config.error_rate:
+            stats.record(name, "error", delay)
+            return _error(500, "server_error", "The stub failed this request on purpose.")
+        if roll < config.error_rate + config.rate_limit_rate:
+            stats.record(name, "rate_limited", delay)
+            return _error(429, "rate_limit_exceeded", "Rate limit reached (stub).", {"retry-after": "1"})
+
+        stats.record(name, "ok", delay)
+        text = answer if isinstance(answer, str) else json.dumps(answer, ensure_ascii=False)
+        return _response(body, text, json.dumps(body.get("input"), ensure_ascii=False))
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.snapshot()
+
+    return app
+
+
+def _schema_latency(values: list[str]) -> tuple[str, dict[str, str]]:
+    default, per_schema = StubConfig.latency, {}
+    for value in values:
+        name, sep, spec = value.partition("=")
+        if sep:
+            per_schema[name] = spec
+        else:
+            default = value
+    for spec in (default, *per_schema.values()):
+        parse_latency(spec)                 # fail on the command line, not on the first request
+    return default, per_schema
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI Responses API for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", action="append", default=[], metavar="[SCHEMA=]DIST:PARAMS",
+                        help="latency distribution, e.g. lognormal:0.3,0.4 or Options=fixed:0.05 (repeatable)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests failing with 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        default, per_schema = _schema_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+    config = StubConfig(latency=default, schema_latency=per_schema, error_rate=args.error_rate,
+                        rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    uvicorn.run(build_stub(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
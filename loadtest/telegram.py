@@ -0,0 +1,130 @@
+"""
+Telegram without Telegram: signed Mini App ``initData``, synthetic updates and a Bot API
+session that answers locally.
+
+:class:`FakeTelegramSession` replaces the aiohttp session of an aiogram ``Bot``: every Bot
+API call (``sendMessage``, ``answerCallbackQuery``, …) succeeds after an optional simulated
+round trip, and the last inline keyboard sent to each chat is remembered so a scripted user
+can "press" its buttons.
+"""
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Optional
+from urllib.parse import urlencode
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, InlineKeyboardMarkup, Message, Update, User
+
+
+def forge_init_data(telegram_id: int, bot_token: str, first_name: str = "Load",
+                    auth_date: Optional[int] = None) -> str:
+    """``initData`` as the Mini App would send it, signed with *bot_token* (see backend/auth.py)."""
+    fields = {
+        "auth_date": str(auth_date or int(time.time())),
+        "query_id": f"AAH{telegram_id}",
+        "user": json.dumps({"id": telegram_id, "first_name": first_name, "language_code": "ru"},
+                           separators=(",", ":")),
+    }
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(key=b"WebAppData", msg=bot_token.encode(), digestmod=hashlib.sha256).digest()
+    fields["hash"] = hmac.new(key=secret, msg=check_string.encode(), digestmod=hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+class FakeTelegramSession(BaseSession):
+    """Bot API session that never leaves the process."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.keyboards: dict[int, tuple[Message, InlineKeyboardMarkup]] = {}   # chat → last keyboard
+        self._message_ids = itertools.count(1_000_000)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, url: str, headers: Optional[dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        name = type(method).__name__
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        chat_id = getattr(method, "chat_id", None)
+        if name.startswith("Send") and chat_id is not None:
+            sent = Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=int(chat_id), type="private"),
+                text=getattr(method, "text", None),
+                reply_markup=getattr(method, "reply_markup", None),
+            ).as_(bot)
+            if isinstance(sent.reply_markup, InlineKeyboardMarkup):
+                self.keyboards[sent.chat.id] = (sent, sent.reply_markup)
+            return sent
+        if name == "EditMessageReplyMarkup" and chat_id is not None and not method.reply_markup:
+            shown = self.keyboards.get(int(chat_id))
+            if shown and shown[0].message_id == method.message_id:       # keyboard removed
+                del self.keyboards[int(chat_id)]
+        return True             # answerCallbackQuery, deleteMessage, edits, …
+
+    def button(self, chat_id: int, prefix: str) -> Optional[tuple[Message, str]]:
+        """Message and ``callback_data`` of the first button starting with *prefix*, if shown."""
+        shown = self.keyboards.get(chat_id)
+        if shown is None:
+            return None
+        message, keyboard = shown
+        for row in keyboard.inline_keyboard:
+            for button in row:
+                if button.callback_data and button.callback_data.startswith(prefix):
+                    return message, button.callback_data
+        return None
+
+
+class UpdateFactory:
+    """Synthetic private-chat updates from a given user."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def user(telegram_id: int) -> User:
+        return User(id=telegram_id, is_bot=False, first_name="Load", last_name=str(telegram_id),
+                    language_code="ru")
+
+    def _mount(self, update: Update) -> Update:
+        # like updates from polling: every nested object knows the bot (message.answer() etc.)
+        return Update.model_validate(update.model_dump(), context={"bot": self.bot})
+
+    def message(self, telegram_id: int, text: str) -> Update:
+        n = next(self._ids)
+        return self._mount(Update(update_id=n, message=Message(
+            message_id=n,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=telegram_id, type="private"),
+            from_user=self.user(telegram_id),
+            text=text,
+        )))
+
+    def callback(self, telegram_id: int, message: Message, data: str) -> Update:
+        n = next(self._ids)
+        return self._mount(Update(update_id=n, callback_query=CallbackQuery(
+            id=str(n),
+            from_user=self.user(telegram_id),
+            chat_instance=str(telegram_id),
+            message=message,
+            data=data,
+        )))
@@ -197,6 +197,33 @@ export const postPronunciation = async (
   return data;
 };
 
+export interface PronunciationBatchItem {
+  task_id: string | null;
+  word: string;
+  status: number;
+  result: PronunciationResponse | null;
+  detail: string | null;
+  retry_after: number | null;
+}
+
+/** Several recordings in one request; failures are reported per item. */
+export const postPronunciationBatch = async (
+  items: { taskId: string | number; word: string; audioBlob: Blob }[]
+): Promise<PronunciationBatchItem[]> => {
+  const form = new FormData();
+  items.forEach(({ taskId, word, audioBlob }) => {
+    form.append('task_id', String(taskId));
+    form.append('word', word);
+    form.append('audio', audioBlob, 'voice.webm');
+  });
+
+  const { data } = await api.post<{ items: PronunciationBatchItem[] }>(
+    '/pronunciation/batch',
+    form
+  );
+  return data.items;
+};
+
 export interface RepeatPayload {
   word: string;
   score: number;
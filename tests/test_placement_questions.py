@@ -0,0 +1,85 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test")     # bot.ai builds its client on import
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.handlers import start
+
+
+class FakeMessage:
+    def __init__(self):
+        self.chat = SimpleNamespace(id=1)
+        self.questions = 0
+        self.finished = False
+
+    async def answer(self, *args, reply_markup=None, **kwargs):
+        if reply_markup is None:
+            return
+        data = reply_markup.inline_keyboard[0][0].callback_data
+        if data.startswith("lvl_"):
+            self.finished = True
+        else:
+            self.questions += 1
+
+    async def delete(self):
+        pass
+
+    async def edit_reply_markup(self, *args, **kwargs):
+        pass
+
+
+def _options(word: str) -> dict:
+    return {"correct": f"{word}-ru", **{f"wrong{i}": f"{word}-{i}" for i in range(1, 10)}}
+
+
+def _play(monkeypatch, skip_first: bool = False):
+    """Run the whole placement test; returns (bank lookups with their hit, live GPT calls, message)."""
+    # as `python -m cefr.questions` builds it by default: every lexicon word at its own band
+    bank = {(w, b): _options(w) for w, b in zip(start.LEXICON_DF["word"], start.LEXICON_DF["band"])}
+    lookups, live_calls = [], []
+
+    def get_question(word, level):
+        hit = bank.get((word, level))
+        if skip_first and not lookups:
+            hit = None
+        lookups.append((word, level, hit is not None))
+        return hit
+
+    async def get_translation_options(word, level):
+        live_calls.append((word, level))
+        return []                                      # the API failed
+
+    monkeypatch.setattr(start, "get_question", get_question)
+    monkeypatch.setattr(start, "get_translation_options", get_translation_options)
+
+    async def main():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=0, chat_id=1, user_id=1))
+        msg = FakeMessage()
+        await start.launch_quiz(msg, state)
+        while not msg.finished:
+            cb = SimpleNamespace(data="ans_x", message=msg, answer=lambda *a, **k: asyncio.sleep(0))
+            await start.check_answer(cb, state)
+        return msg
+
+    return lookups, live_calls, asyncio.run(main())
+
+
+def test_every_queued_word_is_found_in_the_question_bank(monkeypatch):
+    lookups, live_calls, msg = _play(monkeypatch)
+    assert len(lookups) == 15
+    assert all(hit for _, _, hit in lookups)
+    assert live_calls == []
+    assert msg.questions == 15
+
+
+def test_word_without_options_is_skipped_and_the_level_stays_in_step(monkeypatch):
+    lookups, live_calls, msg = _play(monkeypatch, skip_first=True)
+    first = lookups[0][:2]
+    assert live_calls == [first, first]                # retried once, then skipped
+    assert all(hit for _, _, hit in lookups[1:])
+    assert msg.questions == 14 and msg.finished
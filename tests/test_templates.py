@@ -0,0 +1,29 @@
+import numpy as np
+
+from audio.templates import build_templates
+
+
+def _ref(seed: int, frames: int = 15) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(39, frames)).astype(np.float32)
+
+
+def test_identical_references_give_one_template():
+    a = _ref(0)
+    templates = build_templates([a.copy() for _ in range(8)])
+    assert len(templates) == 1
+    template, info = templates[0]
+    assert info["members"] == 8
+    assert np.allclose(template, a, atol=1e-4)
+
+
+def test_duplicated_takes_still_split_into_non_empty_groups():
+    a, b = _ref(1), _ref(2, frames=18)
+    templates = build_templates([a.copy() for _ in range(4)] + [b.copy() for _ in range(4)])
+    assert sorted(info["members"] for _, info in templates) == [4, 4]
+
+
+def test_duplicates_among_distinct_references():
+    refs = [_ref(3)] * 5 + [_ref(i + 10) for i in range(7)]
+    templates = build_templates(refs)
+    assert sum(info["members"] for _, info in templates) == len(refs)
+    assert all(info["members"] > 0 for _, info in templates)